@@ -1,32 +1,29 @@
-import pandas as pd
 import numpy as np
 from scipy import stats
+from derived_facts import get_derived_facts, SUBJECT_COLUMNS
+
+# Columns of the per-student records in top performer and at-risk lists
+STUDENT_RECORD_COLUMNS = ['student_id', 'name', 'average_grade']
 
 class StudentAnalytics:
     """Class for performing student data analytics"""
     
     def get_summary_stats(self, df):
         """Generate summary statistics for the dataset"""
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        facts = get_derived_facts(df)
         
         summary = {
-            'total_students': len(df),
+            'total_students': facts.total_students,
             'statistics': {},
             'grade_distribution': self._get_grade_distribution(df),
             'performance_categories': self._categorize_performance(df)
         }
         
-        # Calculate statistics for numeric columns
-        for col in numeric_cols:
+        # Statistics for numeric columns
+        for col, col_stats in facts.stats.items():
             if col in ['math', 'science', 'english', 'history', 'average_grade', 'attendance']:
                 summary['statistics'][col] = {
-                    'mean': float(df[col].mean()),
-                    'median': float(df[col].median()),
-                    'std': float(df[col].std()),
-                    'min': float(df[col].min()),
-                    'max': float(df[col].max()),
-                    'q1': float(df[col].quantile(0.25)),
-                    'q3': float(df[col].quantile(0.75))
+                    name: float(value) for name, value in col_stats.items()
                 }
         
         return summary
@@ -36,79 +33,111 @@ class StudentAnalytics:
         if 'average_grade' not in df.columns:
             return {}
         
-        bins = [0, 60, 70, 80, 90, 100]
-        labels = ['F', 'D', 'C', 'B', 'A']
-        df['grade_category'] = pd.cut(df['average_grade'], bins=bins, labels=labels, include_lowest=True)
-        
-        distribution = df['grade_category'].value_counts().to_dict()
-        return {str(k): int(v) for k, v in distribution.items()}
+        return dict(get_derived_facts(df).grade_distribution)
     
     def _categorize_performance(self, df):
         """Categorize students by performance level"""
         if 'average_grade' not in df.columns:
             return {}
         
-        categories = {
-            'excellent': len(df[df['average_grade'] >= 90]),
-            'good': len(df[(df['average_grade'] >= 80) & (df['average_grade'] < 90)]),
-            'average': len(df[(df['average_grade'] >= 70) & (df['average_grade'] < 80)]),
-            'below_average': len(df[(df['average_grade'] >= 60) & (df['average_grade'] < 70)]),
-            'failing': len(df[df['average_grade'] < 60])
-        }
-        return categories
+        band_counts = get_derived_facts(df).band_counts
+        return {key: band_counts[key] for key in ['excellent', 'good', 'average', 'below_average', 'failing']}
     
     def get_visualization_data(self, df):
         """Prepare data for various visualizations"""
         viz_data = {}
-        
-        # Subject-wise average scores
-        subject_cols = ['math', 'science', 'english', 'history']
-        if all(col in df.columns for col in subject_cols):
-            viz_data['subject_averages'] = {
-                col: float(df[col].mean()) for col in subject_cols
-            }
-        
-        # Grade distribution for histogram
-        if 'average_grade' in df.columns:
-            hist, bins = np.histogram(df['average_grade'], bins=10, range=(0, 100))
-            viz_data['grade_histogram'] = {
-                'counts': hist.tolist(),
-                'bins': bins.tolist()
-            }
-        
-        # Attendance vs Performance correlation
-        if 'attendance' in df.columns and 'average_grade' in df.columns:
-            viz_data['attendance_vs_grade'] = {
-                'attendance': df['attendance'].tolist(),
-                'grades': df['average_grade'].tolist(),
-                'correlation': float(df['attendance'].corr(df['average_grade']))
-            }
-        
-        # Top performers
-        if 'average_grade' in df.columns and 'student_id' in df.columns:
-            top_10 = df.nlargest(10, 'average_grade')[['student_id', 'name', 'average_grade']]
-            viz_data['top_performers'] = top_10.to_dict('records')
-        
-        # Subject-wise performance distribution
-        if all(col in df.columns for col in subject_cols):
-            viz_data['subject_distributions'] = {}
-            for subject in subject_cols:
-                viz_data['subject_distributions'][subject] = {
-                    'above_80': int(len(df[df[subject] >= 80])),
-                    'between_60_80': int(len(df[(df[subject] >= 60) & (df[subject] < 80)])),
-                    'below_60': int(len(df[df[subject] < 60]))
-                }
-        
-        # Study hours vs performance
-        if 'study_hours' in df.columns and 'average_grade' in df.columns:
-            viz_data['study_hours_impact'] = {
-                'study_hours': df['study_hours'].tolist(),
-                'grades': df['average_grade'].tolist(),
-                'correlation': float(df['study_hours'].corr(df['average_grade']))
-            }
-        
+        for name in ['subject_averages', 'grade_histogram', 'attendance_vs_grade',
+                     'top_performers', 'subject_distributions', 'study_hours_impact']:
+            section = getattr(self, f'_viz_{name}')(df)
+            if section is not None:
+                viz_data[name] = section
         return viz_data
     
+    def iter_dashboard_sections(self, df, at_risk_threshold=65):
+        """Yield (name, data) for every dashboard section, cheapest first
+        
+        Large per-student scatter sections come last so a streaming client
+        can render the summary and small charts before they are ready.
+        """
+        yield 'summary', self.get_summary_stats(df)
+        for name in ['subject_averages', 'grade_histogram', 'subject_distributions',
+                     'top_performers', 'attendance_vs_grade', 'study_hours_impact']:
+            section = getattr(self, f'_viz_{name}')(df)
+            if section is not None:
+                yield name, section
+        yield 'at_risk', self.identify_at_risk_students(df, at_risk_threshold)
+    
+    def diff_dashboard_sections(self, old, new, old_encoded, new_encoded):
+        """Describe what changed between two dashboard snapshots
+        
+        Sections are compared by their encoded JSON (so NaN compares equal
+        to NaN). At-risk students are diffed by student_id.
+        """
+        changed = {
+            name: data for name, data in new.items()
+            if name != 'at_risk' and old_encoded.get(name) != new_encoded[name]
+        }
+        old_ids = {str(student['student_id']) for student in old.get('at_risk', [])}
+        new_ids = {str(student['student_id']) for student in new.get('at_risk', [])}
+        return {
+            'changed': changed,
+            'removed': [name for name in old if name not in new],
+            'new_at_risk': [s for s in new.get('at_risk', []) if str(s['student_id']) not in old_ids],
+            'resolved_at_risk': sorted(old_ids - new_ids),
+            'at_risk_count': len(new_ids)
+        }
+    
+    def _viz_subject_averages(self, df):
+        """Subject-wise average scores"""
+        if not all(col in df.columns for col in SUBJECT_COLUMNS):
+            return None
+        stats = get_derived_facts(df).stats
+        return {col: float(stats[col]['mean']) for col in SUBJECT_COLUMNS}
+    
+    def _viz_grade_histogram(self, df):
+        """Grade distribution for histogram"""
+        if 'average_grade' not in df.columns:
+            return None
+        hist, bins = np.histogram(df['average_grade'], bins=10, range=(0, 100))
+        return {
+            'counts': hist.tolist(),
+            'bins': bins.tolist()
+        }
+    
+    def _viz_attendance_vs_grade(self, df):
+        """Attendance vs Performance correlation"""
+        if 'attendance' not in df.columns or 'average_grade' not in df.columns:
+            return None
+        return {
+            'attendance': df['attendance'].to_numpy(),
+            'grades': df['average_grade'].to_numpy(),
+            'correlation': float(df['attendance'].corr(df['average_grade']))
+        }
+    
+    def _viz_top_performers(self, df):
+        """Top 10 students by average grade"""
+        if not all(col in df.columns for col in STUDENT_RECORD_COLUMNS):
+            return None
+        top_10 = df.nlargest(10, 'average_grade')[STUDENT_RECORD_COLUMNS]
+        return top_10.to_dict('records')
+    
+    def _viz_subject_distributions(self, df):
+        """Subject-wise performance distribution"""
+        if not all(col in df.columns for col in SUBJECT_COLUMNS):
+            return None
+        thresholds = get_derived_facts(df).subject_thresholds
+        return {subject: dict(thresholds[subject]) for subject in SUBJECT_COLUMNS}
+    
+    def _viz_study_hours_impact(self, df):
+        """Study hours vs performance"""
+        if 'study_hours' not in df.columns or 'average_grade' not in df.columns:
+            return None
+        return {
+            'study_hours': df['study_hours'].to_numpy(),
+            'grades': df['average_grade'].to_numpy(),
+            'correlation': float(df['study_hours'].corr(df['average_grade']))
+        }
+    
     def get_student_profile(self, df, student_id):
         """Get detailed profile for a specific student"""
         student = df[df['student_id'] == student_id]
@@ -161,15 +190,21 @@ class StudentAnalytics:
     
     def identify_at_risk_students(self, df, threshold=65):
         """Identify students at risk of failing"""
-        if 'average_grade' not in df.columns:
+        if not all(col in df.columns for col in STUDENT_RECORD_COLUMNS):
             return []
         
         at_risk = df[df['average_grade'] < threshold]
-        return at_risk[['student_id', 'name', 'average_grade']].to_dict('records')
+        return at_risk[STUDENT_RECORD_COLUMNS].to_dict('records')
     
-    def get_correlation_matrix(self, df):
-        """Calculate correlation matrix for numeric features"""
+    def get_correlation_matrix(self, df, as_columns=False):
+        """Calculate correlation matrix for numeric features
+        
+        With as_columns=True the matrix is returned as a 2-D array alongside
+        its column names instead of a nested dict.
+        """
         numeric_cols = df.select_dtypes(include=[np.number]).columns
         corr_matrix = df[numeric_cols].corr()
         
+        if as_columns:
+            return {'columns': [str(col) for col in corr_matrix.columns], 'matrix': corr_matrix.to_numpy()}
         return corr_matrix.to_dict()
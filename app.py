@@ -1,15 +1,25 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import threading
+import time
+from werkzeug.utils import secure_filename
 from analytics import StudentAnalytics
-from ml_predictor import PerformancePredictor
+from ml_predictor import PerformancePredictor, TuningJobManager
 from report_generator import ReportGenerator
+from upload_manager import ChunkedUploadManager, UploadError
+from json_encoding import FastJSONProvider, compress_response
+from derived_facts import DATA_VERSION_ATTR, set_data_version, invalidate_derived_facts
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Largest file accepted by chunked uploads, and how long unfinished uploads are kept
+app.config['MAX_UPLOAD_SIZE'] = int(os.getenv('MAX_UPLOAD_SIZE', 1024 * 1024 * 1024))
+app.config['UPLOAD_SESSION_TTL'] = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 60 * 60))
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -22,6 +32,63 @@ report_gen = ReportGenerator()
 # Sample data for demo
 SAMPLE_DATA = None
 
+# Bumped whenever SAMPLE_DATA is replaced; event streams wait on DATA_CHANGED
+DATA_VERSION = 0
+DATA_CHANGED = threading.Condition()
+SSE_KEEPALIVE_SECONDS = 15
+# Event streams close after this long and the browser reconnects, so an open
+# tab never holds a server thread indefinitely
+SSE_MAX_STREAM_SECONDS = 300
+SSE_RETRY_MILLISECONDS = 2000
+
+# Dashboard sections for the current version, shared by all event streams
+_snapshot = {'version': None, 'sections': None, 'encoded': None}
+_snapshot_lock = threading.Lock()
+
+def set_dataset(df):
+    """Replace the active dataset along with a fresh, untrained predictor
+    
+    Requests still working on the old dataset keep the old predictor, so a
+    model is never reset under them or trained on the wrong data.
+    """
+    global SAMPLE_DATA, DATA_VERSION, predictor
+    with DATA_CHANGED:
+        if SAMPLE_DATA is not None:
+            invalidate_derived_facts(SAMPLE_DATA)
+        DATA_VERSION += 1
+        set_data_version(df, DATA_VERSION)
+        SAMPLE_DATA = df
+        predictor = PerformancePredictor()
+        DATA_CHANGED.notify_all()
+
+def get_dataset_and_predictor():
+    """Return the active dataset and its predictor, loading the sample data on first use"""
+    with DATA_CHANGED:
+        if SAMPLE_DATA is None:
+            set_dataset(get_sample_data())
+        return SAMPLE_DATA, predictor
+
+def get_dataset():
+    """Return the active dataset, loading the sample data through set_dataset on first use"""
+    return get_dataset_and_predictor()[0]
+
+# Chunked uploads are parsed in the background and loaded via set_dataset
+upload_manager = ChunkedUploadManager(app.config['UPLOAD_FOLDER'], on_loaded=set_dataset,
+                                      max_upload_size=app.config['MAX_UPLOAD_SIZE'],
+                                      session_ttl=app.config['UPLOAD_SESSION_TTL'])
+
+def install_tuned_predictor(job, tuned):
+    """Swap in a finished tuning job's predictor unless the dataset changed meanwhile"""
+    global predictor
+    with DATA_CHANGED:
+        if job['dataset_version'] != DATA_VERSION:
+            return False
+        predictor = tuned
+        return True
+
+# Hyperparameter searches run in the background and install their models when done
+tuning_jobs = TuningJobManager(on_complete=install_tuned_predictor)
+
 def get_sample_data():
     """Generate sample student data for demonstration"""
     np.random.seed(42)
@@ -44,6 +111,11 @@ def get_sample_data():
     df['average_grade'] = df[['math', 'science', 'english', 'history']].mean(axis=1).round(2)
     return df
 
+@app.after_request
+def compress_json(response):
+    """gzip/brotli-compress large JSON responses when the client accepts it"""
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
 @app.route('/')
 def index():
     """Main dashboard page"""
@@ -52,8 +124,6 @@ def index():
 @app.route('/api/upload', methods=['POST'])
 def upload_data():
     """Upload student data CSV/Excel file"""
-    global SAMPLE_DATA
-    
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     
@@ -61,81 +131,228 @@ def upload_data():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    filename = secure_filename(file.filename)
+    if not filename.endswith(('.csv', '.xlsx', '.xls')):
+        return jsonify({'error': 'Unsupported file format. Use CSV or Excel'}), 400
+    
     try:
         # Save file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
         # Read file based on extension
-        if file.filename.endswith('.csv'):
-            SAMPLE_DATA = pd.read_csv(filepath)
-        elif file.filename.endswith(('.xlsx', '.xls')):
-            SAMPLE_DATA = pd.read_excel(filepath)
+        if filename.endswith('.csv'):
+            df = pd.read_csv(filepath)
         else:
-            return jsonify({'error': 'Unsupported file format. Use CSV or Excel'}), 400
+            df = pd.read_excel(filepath)
+        set_dataset(df)
         
+        # Report the frame parsed here; another upload may already have replaced it
         return jsonify({
             'message': 'File uploaded successfully',
-            'rows': len(SAMPLE_DATA),
-            'columns': list(SAMPLE_DATA.columns)
+            'rows': len(df),
+            'columns': list(df.columns)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.errorhandler(UploadError)
+def handle_upload_error(e):
+    """Report chunked upload protocol errors as JSON"""
+    return jsonify({'error': str(e), **e.details}), e.status
+
+@app.route('/api/upload/init', methods=['POST'])
+def init_chunked_upload():
+    """Start a resumable upload; body is JSON with filename and size in bytes"""
+    payload = request.get_json(silent=True) or {}
+    status = upload_manager.init_upload(payload.get('filename'), payload.get('size'))
+    return jsonify(status), 201
+
+@app.route('/api/upload/<upload_id>', methods=['PUT'])
+def upload_chunk(upload_id):
+    """Store one chunk; the raw request body is written at ?offset="""
+    offset = request.args.get('offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Missing offset'}), 400
+    return jsonify(upload_manager.write_chunk(upload_id, offset, request.stream))
+
+@app.route('/api/upload/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Finish an upload and start parsing it in the background"""
+    return jsonify(upload_manager.finalize(upload_id)), 202
+
+@app.route('/api/upload/<upload_id>/progress')
+def chunked_upload_progress(upload_id):
+    """Bytes received and parse progress for an upload"""
+    return jsonify(upload_manager.status(upload_id))
+
 @app.route('/api/data/summary')
 def get_summary():
     """Get summary statistics of student data"""
-    global SAMPLE_DATA
+    df = get_dataset()
     
-    if SAMPLE_DATA is None:
-        SAMPLE_DATA = get_sample_data()
-    
-    summary = analytics.get_summary_stats(SAMPLE_DATA)
+    summary = analytics.get_summary_stats(df)
     return jsonify(summary)
 
 @app.route('/api/data/visualizations')
 def get_visualizations():
     """Get data for various visualizations"""
-    global SAMPLE_DATA
-    
-    if SAMPLE_DATA is None:
-        SAMPLE_DATA = get_sample_data()
+    df = get_dataset()
     
-    viz_data = analytics.get_visualization_data(SAMPLE_DATA)
+    viz_data = analytics.get_visualization_data(df)
     return jsonify(viz_data)
 
+@app.route('/api/data/correlations')
+def get_correlations():
+    """Correlation matrix of numeric columns; ?format=columns returns a 2-D array"""
+    df = get_dataset()
+    
+    as_columns = request.args.get('format') == 'columns'
+    return jsonify(analytics.get_correlation_matrix(df, as_columns=as_columns))
+
+@app.route('/api/data/stream')
+def stream_dashboard_sections():
+    """Stream dashboard sections as NDJSON, one line per section as it is computed"""
+    df = get_dataset()
+    version = df.attrs[DATA_VERSION_ATTR]
+    
+    def generate():
+        try:
+            for name, data in analytics.iter_dashboard_sections(df):
+                yield app.json.dumps({'section': name, 'version': version, 'data': data}) + '\n'
+        except Exception as e:
+            # Headers are already sent, so report the failure as a final line
+            app.logger.exception('Streaming dashboard sections failed')
+            yield app.json.dumps({'section': 'error', 'version': version, 'data': {'error': str(e)}}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def get_dashboard_snapshot():
+    """Return (version, sections, encoded sections) for the current dataset"""
+    with _snapshot_lock:
+        df = get_dataset()
+        version = df.attrs[DATA_VERSION_ATTR]
+        if _snapshot['version'] != version:
+            sections = {}
+            try:
+                for name, data in analytics.iter_dashboard_sections(df):
+                    sections[name] = data
+            except Exception as e:
+                # Keep the sections built so far; a failing snapshot would end every event stream
+                app.logger.exception('Building dashboard sections failed')
+                sections['error'] = {'error': str(e)}
+            _snapshot['sections'] = sections
+            _snapshot['encoded'] = {name: app.json.dumps(data) for name, data in sections.items()}
+            _snapshot['version'] = version
+        return _snapshot['version'], _snapshot['sections'], _snapshot['encoded']
+
+def _sse(event, data):
+    # The event id is the dataset version; browsers send it back as Last-Event-ID on reconnect
+    return f"id: {data['version']}\nevent: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+@app.route('/api/data/events')
+def dashboard_events():
+    """Server-Sent Events stream pushing dashboard deltas when the dataset changes
+    
+    Each stream ends after SSE_MAX_STREAM_SECONDS and the browser's
+    EventSource reconnects. A client that reconnects after missing a change
+    gets a 'stale' event and reloads the dashboard.
+    """
+    last_seen = request.headers.get('Last-Event-ID')
+    
+    def generate():
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        version, sections, encoded = get_dashboard_snapshot()
+        yield f"retry: {SSE_RETRY_MILLISECONDS}\n\n"
+        if last_seen is not None and last_seen != str(version):
+            yield _sse('stale', {'version': version})
+        else:
+            yield _sse('hello', {'version': version})
+        while time.monotonic() < deadline:
+            with DATA_CHANGED:
+                DATA_CHANGED.wait_for(lambda: DATA_VERSION != version,
+                                      timeout=min(SSE_KEEPALIVE_SECONDS, max(deadline - time.monotonic(), 0)))
+                changed = DATA_VERSION != version
+            if not changed:
+                yield ': keepalive\n\n'
+                continue
+            new_version, new_sections, new_encoded = get_dashboard_snapshot()
+            delta = analytics.diff_dashboard_sections(sections, new_sections, encoded, new_encoded)
+            yield _sse('update', {'version': new_version, **delta})
+            version, sections, encoded = new_version, new_sections, new_encoded
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/predictions', methods=['POST'])
 def predict_performance():
     """Predict student performance using ML"""
-    global SAMPLE_DATA
-    
-    if SAMPLE_DATA is None:
-        SAMPLE_DATA = get_sample_data()
+    df, model = get_dataset_and_predictor()
     
     try:
-        # Train model if not already trained
-        if not predictor.is_trained:
-            predictor.train(SAMPLE_DATA)
-        
-        # Get predictions
-        predictions = predictor.predict_all(SAMPLE_DATA)
+        as_columns = request.args.get('format') == 'columns'
+        with model.lock:
+            # Train model if not already trained
+            if not model.is_trained:
+                model.train(df)
+            
+            # Get predictions; ?format=columns returns one array per field
+            predictions = model.predict_all(df, as_columns=as_columns)
+            accuracy = model.get_accuracy()
         
         return jsonify({
             'predictions': predictions,
-            'model_accuracy': predictor.get_accuracy()
+            'model_accuracy': accuracy
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predictions/tune', methods=['POST'])
+def tune_predictor():
+    """Start a background hyperparameter search; poll /api/predictions/tune/<job_id>"""
+    df = get_dataset()
+    
+    body = request.get_json(silent=True) or {}
+    time_budget = body.get('time_budget_minutes')
+    if time_budget is not None and (isinstance(time_budget, bool) or not isinstance(time_budget, (int, float))
+                                    or time_budget <= 0):
+        return jsonify({'error': 'time_budget_minutes must be a positive number'}), 400
+    
+    job = tuning_jobs.start(df, time_budget_minutes=time_budget, dataset_version=df.attrs[DATA_VERSION_ATTR])
+    return jsonify(job), 202
+
+@app.route('/api/predictions/tune/<job_id>')
+def tuning_status(job_id):
+    """State and, once finished, results of a tuning job"""
+    job = tuning_jobs.status(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown tuning job'}), 404
+    return jsonify(job)
+
+@app.route('/api/predictions/simulate', methods=['POST'])
+def simulate_predictions():
+    """What-if predictions for a cohort under feature changes"""
+    df, model = get_dataset_and_predictor()
+    
+    body = request.get_json(silent=True) or {}
+    scenarios = body.get('scenarios')
+    cohort = body.get('cohort')
+    if not isinstance(scenarios, list) or (cohort is not None and not isinstance(cohort, dict)):
+        return jsonify({'error': 'Expected a scenarios list and an optional cohort object'}), 400
+    
+    try:
+        return jsonify(model.simulate(df, scenarios, cohort))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/student/<student_id>')
 def get_student_details(student_id):
     """Get detailed analytics for a specific student"""
-    global SAMPLE_DATA
-    
-    if SAMPLE_DATA is None:
-        SAMPLE_DATA = get_sample_data()
+    df = get_dataset()
     
-    student_data = analytics.get_student_profile(SAMPLE_DATA, student_id)
+    student_data = analytics.get_student_profile(df, student_id)
     if student_data is None:
         return jsonify({'error': 'Student not found'}), 404
     
@@ -144,13 +361,10 @@ def get_student_details(student_id):
 @app.route('/api/export/excel', methods=['POST'])
 def export_excel():
     """Export analytics report to Excel"""
-    global SAMPLE_DATA
-    
-    if SAMPLE_DATA is None:
-        SAMPLE_DATA = get_sample_data()
+    df = get_dataset()
     
     try:
-        filepath = report_gen.generate_excel_report(SAMPLE_DATA)
+        filepath = report_gen.generate_excel_report(df)
         return send_file(filepath, as_attachment=True, download_name='student_analytics_report.xlsx')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -158,23 +372,29 @@ def export_excel():
 @app.route('/api/export/pdf', methods=['POST'])
 def export_pdf():
     """Export analytics report to PDF"""
-    global SAMPLE_DATA
-    
-    if SAMPLE_DATA is None:
-        SAMPLE_DATA = get_sample_data()
+    df = get_dataset()
     
     try:
-        filepath = report_gen.generate_pdf_report(SAMPLE_DATA)
+        filepath = report_gen.generate_pdf_report(df)
         return send_file(filepath, as_attachment=True, download_name='student_analytics_report.pdf')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/export/report-cards', methods=['POST'])
+def export_report_cards():
+    """Export per-student report cards as one multi-page PDF"""
+    df = get_dataset()
+    
+    try:
+        filepath = report_gen.generate_report_cards(df)
+        return send_file(filepath, as_attachment=True, download_name='student_report_cards.pdf')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/data/reset', methods=['POST'])
 def reset_data():
     """Reset to sample data"""
-    global SAMPLE_DATA
-    SAMPLE_DATA = get_sample_data()
-    predictor.reset()
+    set_dataset(get_sample_data())
     return jsonify({'message': 'Data reset to sample dataset'})
 
 if __name__ == '__main__':
@@ -0,0 +1,198 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from report_generator import ReportGenerator
+
+DATASET_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+REPORT_EXTENSIONS = {'pdf': '.pdf', 'excel': '.xlsx', 'cards': '_report_cards.pdf'}
+PROGRESS_FILE = 'batch_progress.jsonl'
+
+# One generator per worker process so styles, fonts and chart figures are
+# loaded once and reused for every job the worker picks up
+_generator = None
+
+
+def _init_worker(output_dir):
+    global _generator
+    _generator = ReportGenerator(output_dir)
+
+
+def read_dataset(path):
+    """Load a CSV or Excel dataset"""
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    if path.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(path)
+    raise ValueError(f"Unsupported file format: {path}")
+
+
+def _check_unique_names(datasets):
+    """Raise if two datasets would write to the same report files"""
+    seen = {}
+    for name, path in datasets:
+        if name in seen:
+            raise ValueError(f"Datasets {seen[name]} and {path} share the report name '{name}'")
+        seen[name] = path
+
+
+def discover_datasets(source):
+    """Return (name, path) pairs from a directory of datasets or a manifest file
+
+    A manifest is a CSV with a 'dataset' column and an optional 'name' column;
+    relative dataset paths are resolved against the manifest's directory.
+    Names default to the file stem; when two files share a stem (a.csv and
+    a.xlsx) their names keep the extension instead (a_csv, a_xlsx).
+    """
+    entries = []
+    if os.path.isdir(source):
+        for entry in sorted(os.listdir(source)):
+            if entry.endswith(DATASET_EXTENSIONS):
+                entries.append((None, os.path.join(source, entry)))
+    else:
+        base_dir = os.path.dirname(os.path.abspath(source))
+        with open(source, newline='') as fh:
+            for row in csv.DictReader(fh):
+                path = row['dataset'].strip()
+                if not os.path.isabs(path):
+                    path = os.path.join(base_dir, path)
+                entries.append(((row.get('name') or '').strip() or None, path))
+
+    stems = [os.path.splitext(os.path.basename(path))[0] for _, path in entries]
+    datasets = []
+    for (name, path), stem in zip(entries, stems):
+        if name is None:
+            name = stem if stems.count(stem) == 1 else os.path.basename(path).replace('.', '_')
+        datasets.append((name, path))
+    _check_unique_names(datasets)
+    return datasets
+
+
+def _generate_reports(name, path, formats):
+    """Worker entry point: build every requested report for one dataset"""
+    df = read_dataset(path)
+    outputs = []
+    for fmt in formats:
+        final_path = os.path.join(_generator.output_dir, name + REPORT_EXTENSIONS[fmt])
+        # Write under a temporary name so an interrupted job never looks complete
+        partial_path = os.path.join(_generator.output_dir, name + '.partial' + REPORT_EXTENSIONS[fmt])
+        if fmt == 'pdf':
+            _generator.generate_pdf_report(df, partial_path)
+        elif fmt == 'cards':
+            _generator.generate_report_cards(df, partial_path)
+        else:
+            _generator.generate_excel_report(df, partial_path)
+        os.replace(partial_path, final_path)
+        outputs.append((fmt, final_path))
+    return outputs
+
+
+class BatchReportRunner:
+    """Generate reports for many datasets across worker processes, resumably"""
+
+    def __init__(self, output_dir='reports/batch', formats=('pdf', 'excel'), workers=None, resume=True):
+        unknown = set(formats) - set(REPORT_EXTENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown report formats: {', '.join(sorted(unknown))}")
+        self.output_dir = output_dir
+        self.formats = list(formats)
+        self.workers = workers or os.cpu_count()
+        self.resume = resume
+        self.progress_path = os.path.join(output_dir, PROGRESS_FILE)
+
+    def _load_progress(self):
+        """Reports recorded as finished whose output file still exists"""
+        done = set()
+        if not (self.resume and os.path.exists(self.progress_path)):
+            return done
+        with open(self.progress_path) as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Truncated last line from an interrupted run
+                if 'dataset' in entry and os.path.exists(entry['output']):
+                    done.add((entry['dataset'], entry['format']))
+        return done
+
+    def run(self, datasets):
+        """Generate reports for (name, path) pairs and return run statistics"""
+        _check_unique_names(datasets)
+        os.makedirs(self.output_dir, exist_ok=True)
+        done = self._load_progress()
+        if not self.resume and os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+
+        jobs = []
+        skipped = 0
+        for name, path in datasets:
+            pending = [fmt for fmt in self.formats if (os.path.abspath(path), fmt) not in done]
+            skipped += len(self.formats) - len(pending)
+            if pending:
+                jobs.append((name, path, pending))
+
+        total = sum(len(pending) for _, _, pending in jobs)
+        generated = 0
+        failures = []
+        start = time.perf_counter()
+
+        with open(self.progress_path, 'a') as progress, \
+                ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                    initargs=(self.output_dir,)) as executor:
+            futures = {executor.submit(_generate_reports, *job): job for job in jobs}
+            for future in as_completed(futures):
+                name, path, pending = futures[future]
+                try:
+                    outputs = future.result()
+                except Exception as e:
+                    failures.append({'name': name, 'dataset': path, 'error': str(e)})
+                    print(f"[failed] {name}: {e}")
+                    continue
+
+                for fmt, output in outputs:
+                    progress.write(json.dumps({'dataset': os.path.abspath(path), 'name': name,
+                                               'format': fmt, 'output': output}) + '\n')
+                progress.flush()
+                generated += len(outputs)
+
+                elapsed = time.perf_counter() - start
+                rate = generated / elapsed * 60 if elapsed else 0.0
+                print(f"[{generated}/{total}] {name} ({rate:.1f} reports/min)")
+
+        elapsed = time.perf_counter() - start
+        return {
+            'generated': generated,
+            'skipped': skipped,
+            'failed': failures,
+            'seconds': elapsed,
+            'reports_per_minute': generated / elapsed * 60 if elapsed else 0.0
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate PDF/Excel reports for many datasets')
+    parser.add_argument('source', help='Directory of CSV/Excel datasets or a manifest CSV')
+    parser.add_argument('--output-dir', default='reports/batch', help='Where reports are written')
+    parser.add_argument('--formats', nargs='+', choices=sorted(REPORT_EXTENSIONS), default=['pdf', 'excel'])
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--restart', action='store_true', help='Ignore progress from a previous run')
+    args = parser.parse_args(argv)
+
+    runner = BatchReportRunner(args.output_dir, args.formats, args.workers, resume=not args.restart)
+    try:
+        datasets = discover_datasets(args.source)
+    except ValueError as e:
+        parser.error(str(e))
+    stats = runner.run(datasets)
+
+    print(f"Generated {stats['generated']} reports in {stats['seconds']:.1f}s "
+          f"({stats['reports_per_minute']:.1f} reports/min), "
+          f"skipped {stats['skipped']} already done, {len(stats['failed'])} failed")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
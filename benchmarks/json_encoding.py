@@ -0,0 +1,100 @@
+"""Benchmark JSON encoding of large API payloads.
+
+Compares Flask's default provider on the list-based payloads the routes
+used to build against FastJSONProvider on NumPy/columnar payloads, and
+reports compressed sizes. Run from the repository root:
+
+    python -m benchmarks.json_encoding --students 100000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from analytics import StudentAnalytics
+from ml_predictor import PerformancePredictor
+from json_encoding import FastJSONProvider, compress_body, orjson, brotli
+
+
+def make_dataset(n_students):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'student_id': [f'STU{i:07d}' for i in range(1, n_students + 1)],
+        'name': [f'Student {i}' for i in range(1, n_students + 1)],
+        'math': rng.integers(40, 100, n_students),
+        'science': rng.integers(35, 100, n_students),
+        'english': rng.integers(45, 100, n_students),
+        'history': rng.integers(40, 95, n_students),
+        'attendance': rng.integers(60, 100, n_students),
+        'study_hours': rng.integers(5, 30, n_students)
+    })
+    df['average_grade'] = df[['math', 'science', 'english', 'history']].mean(axis=1).round(2)
+    return df
+
+
+def as_lists(obj):
+    """Convert arrays to lists, like the routes did before the fast provider"""
+    if isinstance(obj, dict):
+        return {key: as_lists(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [as_lists(value) for value in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return obj
+
+
+def time_encode(encode, payload, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode(payload)
+        best = min(best, time.perf_counter() - start)
+    return best, data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare JSON encode time and payload size')
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    df = make_dataset(args.students)
+    analytics = StudentAnalytics()
+    predictor = PerformancePredictor()
+    predictor.train(df.sample(n=min(len(df), 5000), random_state=0))
+
+    viz = analytics.get_visualization_data(df)
+    payloads = {
+        'visualizations': (as_lists(viz), viz),
+        'predictions': (predictor.predict_all(df), predictor.predict_all(df, as_columns=True)),
+        'correlations': (analytics.get_correlation_matrix(df), analytics.get_correlation_matrix(df, as_columns=True))
+    }
+
+    app = Flask(__name__)
+    encoders = [('flask default', DefaultJSONProvider(app), 0)]
+    encoders.append(('fast (stdlib)', FastJSONProvider(app, 'stdlib'), 1))
+    if orjson is not None:
+        encoders.append(('fast (orjson)', FastJSONProvider(app, 'orjson'), 1))
+    compressions = ['gzip'] + (['br'] if brotli is not None else [])
+
+    print(f"{'payload':<15} {'encoder':<14} {'layout':<8} {'encode ms':>10} {'bytes':>12}"
+          + ''.join(f" {name + ' bytes':>12} {name + ' ms':>8}" for name in compressions))
+    for name, variants in payloads.items():
+        for label, provider, variant in encoders:
+            for layout_index in sorted({0, variant}):
+                payload = variants[layout_index]
+                encode = provider.dumps_bytes if hasattr(provider, 'dumps_bytes') \
+                    else (lambda obj, p=provider: p.dumps(obj).encode('utf-8'))
+                seconds, data = time_encode(encode, payload, args.repeat)
+                line = (f"{name:<15} {label:<14} {'arrays' if layout_index else 'lists':<8} "
+                        f"{seconds * 1000:>10.1f} {len(data):>12,}")
+                for encoding in compressions:
+                    start = time.perf_counter()
+                    compressed = compress_body(data, encoding)
+                    line += f" {len(compressed):>12,} {(time.perf_counter() - start) * 1000:>8.1f}"
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark PDF generation throughput.
+
+Run from the repository root:
+
+    python -m benchmarks.pdf_reports --students 500 --reports 20
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from app import get_sample_data
+from report_generator import ReportGenerator
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds else float('inf')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure PDFs generated per second')
+    parser.add_argument('--students', type=int, default=500, help='Students in the report card run')
+    parser.add_argument('--reports', type=int, default=20, help='Full analytics reports to generate')
+    args = parser.parse_args(argv)
+
+    df = get_sample_data()
+    cards_df = df.sample(n=args.students, replace=True, random_state=0).reset_index(drop=True)
+    cards_df['student_id'] = [f'STU{i:06d}' for i in range(1, len(cards_df) + 1)]
+
+    output_dir = tempfile.mkdtemp(prefix='pdf_bench_')
+    try:
+        generator = ReportGenerator(output_dir)
+        # Warm up styles, fonts and chart figures so the timings are steady-state
+        generator.generate_pdf_report(df, f'{output_dir}/warmup.pdf')
+
+        start = time.perf_counter()
+        for i in range(args.reports):
+            generator.generate_pdf_report(df, f'{output_dir}/report_{i}.pdf')
+        full_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        paths = generator.generate_report_cards(cards_df, f'{output_dir}/cards', separate=True)
+        separate_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        generator.generate_report_cards(cards_df, f'{output_dir}/cards.pdf')
+        combined_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    print(f"Full analytics reports:    {args.reports} PDFs in {full_seconds:.2f}s "
+          f"({_rate(args.reports, full_seconds):.1f} PDFs/s)")
+    print(f"Report cards, one per file: {len(paths)} PDFs in {separate_seconds:.2f}s "
+          f"({_rate(len(paths), separate_seconds):.1f} PDFs/s)")
+    print(f"Report cards, one document: {args.students} pages in {combined_seconds:.2f}s "
+          f"({_rate(args.students, combined_seconds):.1f} pages/s)")
+
+
+if __name__ == '__main__':
+    main()
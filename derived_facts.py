@@ -0,0 +1,158 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+SUBJECT_COLUMNS = ['math', 'science', 'english', 'history']
+
+# Performance bands from lowest to highest. A grade belongs to band i when
+# BAND_EDGES[i-1] <= grade < BAND_EDGES[i].
+BAND_EDGES = [60, 70, 80, 90]
+BAND_KEYS = ['failing', 'below_average', 'average', 'good', 'excellent']
+BAND_LABELS = ['Failing (<60)', 'Below Average (60-69)', 'Average (70-79)', 'Good (80-89)', 'Excellent (90+)']
+PASS_MARK = 60
+
+# Letter grades use right-closed bins, matching pd.cut defaults
+LETTER_BINS = [0, 60, 70, 80, 90, 100]
+LETTER_LABELS = ['F', 'D', 'C', 'B', 'A']
+
+# Dataset version stamped into df.attrs by whoever owns the dataset; bump it
+# (or call invalidate_derived_facts) after editing values in place
+DATA_VERSION_ATTR = 'data_version'
+
+_cache = {}
+
+
+def compute_band_codes(grades):
+    """Map each grade to an index into BAND_KEYS, -1 for missing grades"""
+    grades = np.asarray(grades, dtype=float)
+    codes = np.searchsorted(BAND_EDGES, grades, side='right').astype(np.int8)
+    codes[np.isnan(grades)] = -1
+    return codes
+
+
+def count_bands(codes):
+    """Number of students in each band, indexed like BAND_KEYS"""
+    return np.bincount(codes[codes >= 0], minlength=len(BAND_KEYS))
+
+
+def count_letters(grades):
+    """Number of students per letter grade, indexed like LETTER_LABELS"""
+    codes = pd.cut(np.asarray(grades, dtype=float), bins=LETTER_BINS, labels=False, include_lowest=True)
+    codes = codes[~np.isnan(codes)].astype(np.int64)
+    return np.bincount(codes, minlength=len(LETTER_LABELS))
+
+
+def count_subject_thresholds(scores):
+    """Counts above 80, between 60 and 80, and below 60 for one subject"""
+    scores = np.asarray(scores, dtype=float)
+    above_80 = int(np.count_nonzero(scores >= 80))
+    below_60 = int(np.count_nonzero(scores < 60))
+    valid = int(np.count_nonzero(~np.isnan(scores)))
+    return {
+        'above_80': above_80,
+        'between_60_80': valid - above_80 - below_60,
+        'below_60': below_60
+    }
+
+
+def percentile_ranks(values):
+    """Percentile rank of every value within its column, matching scipy's percentileofscore(kind='rank')"""
+    values = np.asarray(values, dtype=float)
+    ranked = np.sort(values[~np.isnan(values)])
+    if len(ranked) == 0:
+        return np.full(len(values), np.nan)
+    left = np.searchsorted(ranked, values, side='left')
+    right = np.searchsorted(ranked, values, side='right')
+    ranks = (left + right + (right > left)) * 50.0 / len(ranked)
+    ranks[np.isnan(values)] = np.nan
+    return ranks
+
+
+class DerivedFacts:
+    """Derived columns and aggregates computed once per dataset version"""
+
+    def __init__(self, df):
+        self.total_students = len(df)
+        self.stats = self._compute_stats(df)
+        self.subject_thresholds = self._compute_subject_thresholds(df)
+
+        self.band_codes = None
+        self.band_counts = {}
+        self.grade_distribution = {}
+        if 'average_grade' in df.columns:
+            grades = df['average_grade'].to_numpy(dtype=float)
+            self.band_codes = compute_band_codes(grades)
+            counts = count_bands(self.band_codes)
+            self.band_counts = {key: int(count) for key, count in zip(BAND_KEYS, counts)}
+
+            letters = pd.cut(df['average_grade'], bins=LETTER_BINS, labels=LETTER_LABELS, include_lowest=True)
+            self.grade_distribution = {str(k): int(v) for k, v in letters.value_counts().items()}
+
+    def _compute_stats(self, df):
+        """Descriptive statistics for every numeric column"""
+        stats = {}
+        numeric = df.select_dtypes(include=[np.number])
+        for col in numeric.columns:
+            series = numeric[col]
+            q1, median, q3 = series.quantile([0.25, 0.5, 0.75])
+            stats[col] = {
+                'mean': series.mean(),
+                'median': median,
+                'std': series.std(),
+                'min': series.min(),
+                'max': series.max(),
+                'q1': q1,
+                'q3': q3
+            }
+        return stats
+
+    def _compute_subject_thresholds(self, df):
+        """Per-subject counts above 80, between 60 and 80, and below 60"""
+        thresholds = {}
+        for subject in SUBJECT_COLUMNS:
+            if subject in df.columns:
+                thresholds[subject] = count_subject_thresholds(df[subject].to_numpy(dtype=float))
+        return thresholds
+
+    @property
+    def passing(self):
+        """Boolean mask of students at or above the pass mark"""
+        if self.band_codes is None:
+            return None
+        return self.band_codes >= BAND_KEYS.index('below_average')
+
+    def band_table(self):
+        """(label, count) pairs for the performance bands, best first"""
+        return [(label, self.band_counts.get(key, 0)) for key, label in reversed(list(zip(BAND_KEYS, BAND_LABELS)))]
+
+
+def get_derived_facts(df):
+    """Return the cached DerivedFacts for df's current version
+
+    Facts are recomputed when the dataset version in df.attrs, its row
+    count or its columns change.
+    """
+    key = id(df)
+    signature = (df.attrs.get(DATA_VERSION_ATTR), len(df), tuple(df.columns))
+    entry = _cache.get(key)
+    if entry is not None:
+        ref, cached_signature, facts = entry
+        if ref() is df and cached_signature == signature:
+            return facts
+
+    facts = DerivedFacts(df)
+    _cache[key] = (weakref.ref(df, lambda _, key=key: _cache.pop(key, None)), signature, facts)
+    return facts
+
+
+def set_data_version(df, version):
+    """Stamp df with a dataset version so cached facts follow it"""
+    df.attrs[DATA_VERSION_ATTR] = version
+
+
+def invalidate_derived_facts(df=None):
+    """Drop cached facts for df (or for every dataset) after an in-place edit"""
+    if df is None:
+        _cache.clear()
+    else:
+        _cache.pop(id(df), None)
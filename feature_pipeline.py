@@ -0,0 +1,111 @@
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+MIN_FEATURES = 3
+# Derived feature name -> (numerator column, denominator column)
+RATIO_FEATURES = {
+    'assignment_completion': ('assignments_submitted', 'total_assignments')
+}
+
+
+class FeaturePipeline:
+    """Fitted feature preparation shared by training and inference
+
+    Turns a DataFrame (or a single student's feature dict) into one float32
+    block: raw columns plus derived ratios, missing values filled with the
+    training means, then standardized. The fill values and scaler are
+    learned once in fit() and reused for every later transform, and the
+    whole object pickles with joblib alongside the models.
+    """
+
+    def __init__(self, feature_columns):
+        self.feature_columns = list(feature_columns)
+        self.features = None
+        self.fill_values = None
+        self.scaler = None
+
+    @property
+    def is_fitted(self):
+        return self.scaler is not None
+
+    def select_features(self, columns):
+        """Input and derived features available for a frame with these columns"""
+        features = [col for col in self.feature_columns if col in columns]
+        if len(features) < MIN_FEATURES:
+            raise ValueError("Insufficient features for prediction")
+        features += [name for name, (num, den) in RATIO_FEATURES.items()
+                     if num in columns and den in columns]
+        return features
+
+    def extract(self, df):
+        """Raw float32 feature block (NaN where missing), before imputation and scaling
+
+        Columns missing from df are left as NaN so they take the training
+        fill value. Each column is written straight into the block.
+        """
+        if not self.is_fitted:
+            self.features = self.select_features(df.columns)
+
+        X = np.full((len(df), len(self.features)), np.nan, dtype=np.float32)
+        for j, name in enumerate(self.features):
+            if name in RATIO_FEATURES:
+                num, den = RATIO_FEATURES[name]
+                if num in df.columns and den in df.columns:
+                    numerator = df[num].to_numpy(dtype=np.float32, na_value=np.nan)
+                    denominator = df[den].to_numpy(dtype=np.float32, na_value=np.nan)
+                    np.divide(numerator, denominator, out=X[:, j], where=denominator > 0)
+            elif name in df.columns:
+                X[:, j] = df[name].to_numpy(dtype=np.float32, na_value=np.nan)
+        return X
+
+    def fit(self, X):
+        """Learn fill values and scaling from a raw block returned by extract()"""
+        observed = ~np.isnan(X)
+        counts = observed.sum(axis=0)
+        sums = np.where(observed, X, 0).sum(axis=0, dtype=np.float64)
+        self.fill_values = np.divide(sums, counts, out=np.zeros(X.shape[1]), where=counts > 0).astype(np.float32)
+
+        X = X.copy()
+        np.copyto(X, self.fill_values, where=np.isnan(X))
+        self.scaler = StandardScaler().fit(X)
+        return self
+
+    def impute(self, X):
+        """Fill missing values of a raw block in place with the training means"""
+        if not self.is_fitted:
+            raise ValueError("Feature pipeline not fitted yet")
+        np.copyto(X, self.fill_values, where=np.isnan(X))
+        return X
+
+    def scale(self, X):
+        """Standardize an imputed block in place"""
+        if not self.is_fitted:
+            raise ValueError("Feature pipeline not fitted yet")
+        return self.scaler.transform(X, copy=False)
+
+    def apply(self, X):
+        """Impute and scale a raw block in place and return it"""
+        return self.scale(self.impute(X))
+
+    def transform(self, df):
+        """Model-ready float32 block for a DataFrame"""
+        return self.apply(self.extract(df))
+
+    def fit_transform(self, df):
+        X = self.extract(df)
+        return self.fit(X).apply(X)
+
+    def transform_record(self, features):
+        """Model-ready 1 x n block for one student's feature dict; missing values are imputed"""
+        X = np.full((1, len(self.features)), np.nan, dtype=np.float32)
+        for j, name in enumerate(self.features):
+            if name in RATIO_FEATURES:
+                num, den = RATIO_FEATURES[name]
+                value = features.get(name)
+                if value is None and features.get(num) is not None and features.get(den):
+                    value = features[num] / features[den]
+            else:
+                value = features.get(name)
+            if value is not None:
+                X[0, j] = value
+        return self.apply(X)
@@ -1,43 +1,105 @@
 import pandas as pd
 import numpy as np
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
+from sklearn.model_selection import train_test_split, KFold, StratifiedKFold, ParameterSampler
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
 import joblib
 import os
+import functools
+import hashlib
+import json
+import math
+import threading
+import time
+import uuid
+from derived_facts import get_derived_facts, PASS_MARK
+from feature_pipeline import FeaturePipeline
+
+DEFAULT_REGRESSION_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+DEFAULT_CLASSIFICATION_PARAMS = {'n_estimators': 100, 'max_depth': 5}
+
+# Hyperparameter spaces sampled by PerformancePredictor.tune
+REGRESSION_SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 400],
+    'max_depth': [5, 10, 15, 20, None],
+    'min_samples_leaf': [1, 2, 5, 10],
+    'max_features': [1.0, 'sqrt', 0.5]
+}
+CLASSIFICATION_SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 400],
+    'max_depth': [2, 3, 5, 7],
+    'learning_rate': [0.03, 0.1, 0.3],
+    'subsample': [0.7, 0.85, 1.0]
+}
+# Boosting stops adding trees once the held-out score stalls
+CLASSIFICATION_EARLY_STOPPING = {'n_iter_no_change': 10, 'validation_fraction': 0.1}
+HALVING_FACTOR = 3
+MIN_SEARCH_CANDIDATES = 20
+MIN_ROWS_PER_FOLD = 50
+# A budget-limited search never scores its finalists on less than this share of the rows
+MIN_TUNING_FRACTION = 0.1
+PROBE_ROWS = 2000
+# Sampled candidates cost about this much more to fit than the defaults the probe times
+# (more trees on average); measured fit times correct the estimate during a search
+SEARCH_COST_FACTOR = 1.5
+MAX_TUNING_JOBS = 20
+
+
+def _fit_and_score(estimator, params, X, y, train, test):
+    """Fit a clone of estimator with params on one fold and score it on the held-out rows"""
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train], y[train])
+    return model.score(X[test], y[test])
+
+
+# Valid ranges that simulated feature values are clipped to
+SIMULATION_BOUNDS = {
+    'math': (0, 100),
+    'science': (0, 100),
+    'english': (0, 100),
+    'history': (0, 100),
+    'attendance': (0, 100),
+    'study_hours': (0, None),
+    'assignment_completion': (0, 1)
+}
+SIMULATION_OPERATIONS = ('add', 'multiply', 'set')
+SIMULATION_MAX_ROWS = 5_000_000
+
+
+def _locked(method):
+    """Run a PerformancePredictor method while holding the predictor's lock"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class PerformancePredictor:
-    """Machine Learning model for predicting student performance"""
+    """Machine Learning model for predicting student performance
+    
+    Training, prediction and reset hold self.lock, so request threads
+    sharing a predictor never see half-trained models. Hold it yourself to
+    combine several calls consistently.
+    """
     
     def __init__(self):
+        self.lock = threading.RLock()
         self.regression_model = None
         self.classification_model = None
-        self.scaler = StandardScaler()
         self.is_trained = False
         self.feature_columns = ['math', 'science', 'english', 'history', 'attendance', 'study_hours']
+        self.pipeline = FeaturePipeline(self.feature_columns)
         self.model_accuracy = {}
+        self.best_params = {}
     
     def prepare_features(self, df):
-        """Prepare features for ML model"""
-        # Select relevant features
-        available_features = [col for col in self.feature_columns if col in df.columns]
-        
-        if len(available_features) < 3:
-            raise ValueError("Insufficient features for prediction")
-        
-        X = df[available_features].copy()
-        
-        # Handle missing values
-        X = X.fillna(X.mean())
-        
-        return X, available_features
+        """Model-ready float32 feature block from the fitted pipeline"""
+        return self.pipeline.transform(df), self.pipeline.features
     
-    def train(self, df):
-        """Train the ML models"""
-        # Prepare features
-        X, feature_cols = self.prepare_features(df)
-        
+    def prepare_targets(self, df):
+        """Return the regression (average grade) and pass/fail targets"""
         # Calculate average grade if not present
         if 'average_grade' not in df.columns:
             subject_cols = [col for col in ['math', 'science', 'english', 'history'] if col in df.columns]
@@ -45,34 +107,42 @@ class PerformancePredictor:
         
         y_regression = df['average_grade']
         
-        # Create classification target (Pass/Fail)
-        y_classification = (df['average_grade'] >= 60).astype(int)
+        # Create classification target (Pass/Fail) from the shared band codes
+        passing = get_derived_facts(df).passing
+        y_classification = pd.Series(passing.astype(int), index=df.index)
+        
+        return y_regression, y_classification
+    
+    @_locked
+    def train(self, df):
+        """Train the ML models, using tuned hyperparameters when available"""
+        y_regression, y_classification = self.prepare_targets(df)
         
         # Split data
-        X_train, X_test, y_reg_train, y_reg_test = train_test_split(
-            X, y_regression, test_size=0.2, random_state=42
-        )
-        _, _, y_clf_train, y_clf_test = train_test_split(
-            X, y_classification, test_size=0.2, random_state=42
-        )
+        train_idx, test_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+        y_reg_train, y_reg_test = y_regression.iloc[train_idx], y_regression.iloc[test_idx]
+        y_clf_train, y_clf_test = y_classification.iloc[train_idx], y_classification.iloc[test_idx]
         
-        # Scale features
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Fit imputation and scaling on the training rows only, then prepare every row in place
+        self.pipeline = FeaturePipeline(self.feature_columns)
+        X = self.pipeline.extract(df)
+        self.pipeline.fit(X[train_idx])
+        self.pipeline.apply(X)
+        X_train_scaled, X_test_scaled = X[train_idx], X[test_idx]
         
         # Train regression model (predict grade)
+        regression_params = {**DEFAULT_REGRESSION_PARAMS, **self.best_params.get('regression', {})}
         self.regression_model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
+            **regression_params,
             random_state=42,
             n_jobs=-1
         )
         self.regression_model.fit(X_train_scaled, y_reg_train)
         
         # Train classification model (predict pass/fail)
+        classification_params = {**DEFAULT_CLASSIFICATION_PARAMS, **self.best_params.get('classification', {})}
         self.classification_model = GradientBoostingClassifier(
-            n_estimators=100,
-            max_depth=5,
+            **classification_params,
             random_state=42
         )
         self.classification_model.fit(X_train_scaled, y_clf_train)
@@ -88,18 +158,245 @@ class PerformancePredictor:
         }
         
         self.is_trained = True
-        self.trained_features = feature_cols
+        self.trained_features = self.pipeline.features
         
         return self.model_accuracy
     
+    def tune(self, df, time_budget_minutes=None, cv=5, cache_dir='models/tuning', random_state=42):
+        """Search hyperparameters with cross-validated successive halving, then retrain
+        
+        Random candidates are scored with k-fold cross-validation on a
+        growing sample of rows, keeping the best third each round. Each
+        round's (candidate, fold) fits are spread over all cores in
+        joblib.Parallel batches. Results are cached by a fingerprint of
+        the training data and search spaces, so tuning the same dataset
+        again only retrains.
+        
+        With a time budget, a short timing probe sizes each search and
+        reserves time for the final retrain. The clock is checked between
+        batches, so a search that runs slower than estimated stops early
+        with the best candidate scored so far.
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget_minutes * 60 if time_budget_minutes else None
+        
+        # Trees are insensitive to scaling, so a pipeline fitted on all rows is fine here
+        pipeline = FeaturePipeline(self.feature_columns)
+        X = pipeline.fit_transform(df)
+        y_regression, y_classification = self.prepare_targets(df)
+        
+        fingerprint = self._tuning_fingerprint(X, pipeline.features, y_regression, y_classification, cv)
+        cache_path = os.path.join(cache_dir, f'{fingerprint}.json') if cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path) as fh:
+                result = json.load(fh)
+            result['cached'] = True
+        else:
+            result = {'fingerprint': fingerprint, 'cached': False}
+            probe = self._probe_fit_cost(X, y_regression, y_classification)
+            n_jobs = os.cpu_count() or 1
+            
+            # Reserve the final retrain (both models on the training split) out of the budget;
+            # the forest fits on all cores, boosting on one
+            train_rows = int(len(X) * 0.8)
+            retrain = SEARCH_COST_FACTOR * (self._fit_seconds(probe['regression'], train_rows) / n_jobs
+                                            + self._fit_seconds(probe['classification'], train_rows))
+            if deadline and time.perf_counter() + retrain > deadline:
+                raise ValueError(f"Time budget too small: retraining on this dataset alone needs about "
+                                 f"{math.ceil(retrain / 60 * 10) / 10} minutes")
+            result['reserved_retrain_seconds'] = retrain
+            search_deadline = deadline - retrain if deadline else None
+            
+            # Split the search time between the two models by their probed cost
+            cost = {name: self._fit_seconds(probe[name], len(X)) for name in probe}
+            share = cost['regression'] / (cost['regression'] + cost['classification']) if sum(cost.values()) else 0.5
+            
+            regression_deadline = None
+            if search_deadline:
+                regression_deadline = time.perf_counter() + max(search_deadline - time.perf_counter(), 0) * share
+            result['regression'] = self._halving_search(
+                RandomForestRegressor(random_state=random_state, n_jobs=1), 'regression',
+                REGRESSION_SEARCH_SPACE, X, y_regression.to_numpy(),
+                KFold(cv, shuffle=True, random_state=random_state),
+                probe['regression'], regression_deadline, random_state
+            )
+            
+            if y_classification.nunique() < 2:
+                result['classification'] = {'params': {}, 'skipped': 'only one class present'}
+            else:
+                result['classification'] = self._halving_search(
+                    GradientBoostingClassifier(random_state=random_state, **CLASSIFICATION_EARLY_STOPPING),
+                    'classification', CLASSIFICATION_SEARCH_SPACE, X, y_classification.to_numpy(),
+                    StratifiedKFold(cv, shuffle=True, random_state=random_state),
+                    probe['classification'], search_deadline, random_state
+                )
+                if result['classification']['params']:
+                    result['classification']['params'].update(CLASSIFICATION_EARLY_STOPPING)
+            
+            result['search_seconds'] = time.perf_counter() - start
+            # Budget-limited searches depend on machine speed, so only full ones are cached
+            complete = not any(result[name].get('stopped_early') or result[name].get('skipped') == 'time budget exhausted'
+                               for name in ('regression', 'classification'))
+            if cache_path and complete:
+                os.makedirs(cache_dir, exist_ok=True)
+                with open(cache_path, 'w') as fh:
+                    json.dump(result, fh, indent=2)
+        
+        self.best_params = {
+            'regression': result['regression']['params'],
+            'classification': result['classification']['params']
+        }
+        result['model_accuracy'] = self.train(df)
+        result['seconds'] = time.perf_counter() - start
+        return result
+    
+    def _tuning_fingerprint(self, X, features, y_regression, y_classification, cv):
+        """Hash of the training data and search configuration"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(features).encode())
+        digest.update(np.ascontiguousarray(X).tobytes())
+        for series in (y_regression, y_classification):
+            digest.update(pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes())
+        config = [REGRESSION_SEARCH_SPACE, CLASSIFICATION_SEARCH_SPACE, CLASSIFICATION_EARLY_STOPPING, cv]
+        digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+        return digest.hexdigest()[:32]
+    
+    def _probe_fit_cost(self, X, y_regression, y_classification):
+        """Fixed and per-row seconds of a default single-core fit of each model"""
+        large = min(len(X), PROBE_ROWS)
+        small = max(large // 10, 1)
+        costs = {}
+        for name, model, y in [
+            ('regression', RandomForestRegressor(**DEFAULT_REGRESSION_PARAMS, random_state=0, n_jobs=1), y_regression),
+            ('classification', GradientBoostingClassifier(**DEFAULT_CLASSIFICATION_PARAMS, random_state=0), y_classification)
+        ]:
+            if y.iloc[:small].nunique() < 2 and name == 'classification':
+                costs[name] = (0.0, 0.0)
+                continue
+            timings = []
+            for rows in (small, large):
+                t0 = time.perf_counter()
+                model.fit(X[:rows], y.iloc[:rows])
+                timings.append(time.perf_counter() - t0)
+            per_row = max(timings[1] - timings[0], 0.0) / (large - small) if large > small else 0.0
+            costs[name] = (max(timings[0] - per_row * small, 0.0), per_row)
+        return costs
+    
+    def _fit_seconds(self, probe, rows):
+        """Estimated single-core seconds to fit one default model on rows rows"""
+        fixed, per_row = probe
+        return fixed + per_row * rows
+    
+    def _halving_search(self, estimator, kind, space, X, y, cv, probe, deadline, random_state):
+        """Successive halving over random candidates, stopping at the deadline
+        
+        Every round's (candidate, fold) fits run as joblib.Parallel batches
+        across all cores, with the deadline checked between batches. The
+        plan keeps as much of the data as the budget allows, cutting the
+        number of candidates first and the largest sample second (never
+        below MIN_TUNING_FRACTION of the rows). Measured fit times correct
+        the estimates as the search runs.
+        """
+        start = time.perf_counter()
+        n_rows = len(X)
+        folds = cv.get_n_splits()
+        n_jobs = os.cpu_count() or 1
+        # Whole candidates per batch, enough to keep every core busy
+        batch_size = math.ceil(n_jobs / folds)
+        min_resources = min(n_rows, MIN_ROWS_PER_FOLD * folds)
+        # The default parameters always compete, so tuning never settles on something worse
+        default = DEFAULT_REGRESSION_PARAMS if kind == 'regression' else DEFAULT_CLASSIFICATION_PARAMS
+        candidates = [dict(default)] + [
+            params for params in ParameterSampler(space, MIN_SEARCH_CANDIDATES, random_state=random_state)
+            if params != default
+        ][:MIN_SEARCH_CANDIDATES - 1]
+        
+        def schedule(n_candidates, max_resources):
+            rounds = max(min(math.ceil(math.log(n_candidates, HALVING_FACTOR)),
+                             math.floor(math.log(max(max_resources / min_resources, 1), HALVING_FACTOR))) + 1, 1)
+            return [max(int(max_resources / HALVING_FACTOR ** (rounds - 1 - i)), min_resources) for i in range(rounds)]
+        
+        def batch_seconds(n_candidates, rows):
+            # Fits run in waves of n_jobs, each on the training part of a fold
+            waves = math.ceil(n_candidates * folds / n_jobs)
+            return waves * self._fit_seconds(probe, rows * (folds - 1) / folds) * SEARCH_COST_FACTOR
+        
+        def estimate(n_candidates, max_resources):
+            seconds, alive = 0.0, n_candidates
+            for rows in schedule(n_candidates, max_resources):
+                seconds += batch_seconds(alive, rows)
+                alive = math.ceil(alive / HALVING_FACTOR)
+            return seconds
+        
+        n_candidates, max_resources = len(candidates), n_rows
+        if deadline is not None:
+            budget = deadline - time.perf_counter()
+            floor = max(int(n_rows * MIN_TUNING_FRACTION), min(min_resources * HALVING_FACTOR, n_rows))
+            while estimate(n_candidates, max_resources) > budget:
+                if n_candidates > HALVING_FACTOR:
+                    n_candidates -= 1
+                elif max_resources // 2 >= floor:
+                    n_candidates, max_resources = len(candidates), max_resources // 2
+                else:
+                    break
+        
+        order = np.random.RandomState(random_state).permutation(n_rows)
+        survivors = candidates[:n_candidates]
+        correction = [0.0, 0.0]  # Measured and estimated seconds so far
+        best_round, rounds_run, stopped = None, 0, False
+        with joblib.Parallel(n_jobs=n_jobs) as parallel:
+            for rows in schedule(n_candidates, max_resources):
+                subset = order[:rows]
+                X_round, y_round = X[subset], y[subset]
+                splits = list(cv.split(X_round, y_round))
+                scored = []
+                for i in range(0, len(survivors), batch_size):
+                    batch = survivors[i:i + batch_size]
+                    predicted = batch_seconds(len(batch), rows)
+                    ratio = correction[0] / correction[1] if correction[1] else 1.0
+                    if deadline is not None and time.perf_counter() + predicted * ratio > deadline:
+                        stopped = True
+                        break
+                    t0 = time.perf_counter()
+                    scores = parallel(
+                        joblib.delayed(_fit_and_score)(estimator, params, X_round, y_round, train, test)
+                        for params in batch for train, test in splits
+                    )
+                    correction[0] += time.perf_counter() - t0
+                    correction[1] += predicted
+                    for j, params in enumerate(batch):
+                        score = np.mean(scores[j * folds:(j + 1) * folds])
+                        scored.append((-np.inf if np.isnan(score) else score, params))
+                if scored:
+                    scored.sort(key=lambda item: item[0], reverse=True)
+                    best_round = (rows, scored)
+                    rounds_run += 1
+                if stopped or len(scored) <= 1:
+                    break
+                survivors = [params for _, params in scored[:math.ceil(len(scored) / HALVING_FACTOR)]]
+        
+        if best_round is None:
+            return {'params': {}, 'skipped': 'time budget exhausted', 'seconds': time.perf_counter() - start}
+        rows, scored = best_round
+        best_score, best_params = scored[0]
+        return {
+            'params': best_params,
+            'best_score': float(best_score),
+            'candidates': n_candidates,
+            'rounds': rounds_run,
+            'max_resources': int(rows),
+            'stopped_early': stopped,
+            'seconds': time.perf_counter() - start
+        }
+    
+    @_locked
     def predict_grade(self, student_features):
         """Predict grade for a single student"""
         if not self.is_trained:
             raise ValueError("Model not trained yet")
         
-        # Prepare features
-        features = np.array([student_features[col] for col in self.trained_features]).reshape(1, -1)
-        features_scaled = self.scaler.transform(features)
+        # Prepare features with the training fill values and scaling
+        features_scaled = self.pipeline.transform_record(student_features)
         
         # Predict
         predicted_grade = self.regression_model.predict(features_scaled)[0]
@@ -111,33 +408,169 @@ class PerformancePredictor:
             'will_pass': pass_probability >= 0.5
         }
     
-    def predict_all(self, df):
-        """Predict performance for all students"""
+    @_locked
+    def predict_all(self, df, as_columns=False):
+        """Predict performance for all students
+        
+        Returns a list of per-student dicts, or with as_columns=True a dict
+        of arrays (one per field) that serializes far faster for large sets.
+        """
         if not self.is_trained:
             self.train(df)
         
-        X, _ = self.prepare_features(df)
-        X_scaled = self.scaler.transform(X)
+        X_scaled, _ = self.prepare_features(df)
         
         # Make predictions
         predicted_grades = self.regression_model.predict(X_scaled)
         pass_probabilities = self.classification_model.predict_proba(X_scaled)[:, 1]
         
         # Combine with student IDs
-        predictions = []
-        for i, row in df.iterrows():
-            pred = {
-                'student_id': row.get('student_id', f'Student_{i}'),
-                'name': row.get('name', 'N/A'),
-                'current_grade': float(row.get('average_grade', 0)),
-                'predicted_grade': float(predicted_grades[i]),
-                'pass_probability': float(pass_probabilities[i]),
-                'improvement_needed': float(max(0, 60 - predicted_grades[i])),
-                'risk_level': self._categorize_risk(pass_probabilities[i])
-            }
-            predictions.append(pred)
+        n = len(df)
+        columns = {
+            'student_id': df['student_id'].to_numpy() if 'student_id' in df.columns
+            else np.array([f'Student_{i}' for i in df.index], dtype=object),
+            'name': df['name'].to_numpy() if 'name' in df.columns else np.full(n, 'N/A', dtype=object),
+            'current_grade': df['average_grade'].to_numpy(dtype=float) if 'average_grade' in df.columns
+            else np.zeros(n),
+            'predicted_grade': predicted_grades,
+            'pass_probability': pass_probabilities,
+            'improvement_needed': np.maximum(0, PASS_MARK - predicted_grades),
+            # Same thresholds as _categorize_risk
+            'risk_level': np.select([pass_probabilities >= 0.8, pass_probabilities >= 0.6],
+                                    ['Low', 'Medium'], 'High').astype(object)
+        }
+        if as_columns:
+            return columns
+        
+        keys = list(columns)
+        return [dict(zip(keys, values)) for values in zip(*(columns[key].tolist() for key in keys))]
+    
+    @_locked
+    def simulate(self, df, scenarios, cohort=None):
+        """Aggregate prediction changes for a cohort under what-if feature changes
+        
+        scenarios is a list of {'name': ..., 'changes': {feature: {op: value}}}
+        where op is 'add', 'multiply' or 'set', applied to the imputed input
+        values and clipped to SIMULATION_BOUNDS. cohort filters the students:
+        'student_ids', 'risk_levels' (current risk) or {'min': .., 'max': ..}
+        ranges keyed by column name. The baseline and every scenario are
+        stacked into one feature block so each model predicts once.
+        """
+        if not self.is_trained:
+            self.train(df)
+        if not scenarios:
+            raise ValueError("At least one scenario is required")
+        
+        features = self.pipeline.features
+        changes = [self._parse_scenario(scenario, features) for scenario in scenarios]
+        
+        cohort = dict(cohort or {})
+        risk_levels = cohort.pop('risk_levels', None)
+        raw = self.pipeline.impute(self.pipeline.extract(df)[self._cohort_mask(df, cohort)])
+        if risk_levels is not None:
+            if isinstance(risk_levels, str):
+                risk_levels = [risk_levels]
+            if not isinstance(risk_levels, list) or not all(level in ('High', 'Medium', 'Low') for level in risk_levels):
+                raise ValueError("risk_levels must be a list of 'High', 'Medium' or 'Low'")
+            probabilities = self.classification_model.predict_proba(self.pipeline.scale(raw.copy()))[:, 1]
+            current = np.select([probabilities >= 0.8, probabilities >= 0.6], ['Low', 'Medium'], 'High')
+            raw = raw[np.isin(current, risk_levels)]
         
-        return predictions
+        n = len(raw)
+        if n == 0:
+            raise ValueError("No students match the cohort filter")
+        if n * (len(changes) + 1) > SIMULATION_MAX_ROWS:
+            raise ValueError(f"Simulation too large: {n} students x {len(changes)} scenarios")
+        
+        # Block 0 is the baseline; block i + 1 holds scenario i
+        grid = np.tile(raw, (len(changes) + 1, 1))
+        for i, scenario_changes in enumerate(changes, start=1):
+            block = grid[i * n:(i + 1) * n]
+            for j, op, value in scenario_changes:
+                column = block[:, j]
+                if op == 'add':
+                    column += value
+                elif op == 'multiply':
+                    column *= value
+                else:
+                    column[:] = value
+                low, high = SIMULATION_BOUNDS.get(features[j], (None, None))
+                if low is not None or high is not None:
+                    np.clip(column, low, high, out=column)
+        
+        self.pipeline.scale(grid)
+        grades = self.regression_model.predict(grid).reshape(-1, n)
+        probabilities = self.classification_model.predict_proba(grid)[:, 1].reshape(-1, n)
+        
+        base_grades, base_probabilities = grades[0], probabilities[0]
+        base_passing = base_grades >= PASS_MARK
+        base_high_risk = base_probabilities < 0.6
+        results = []
+        for i, scenario in enumerate(scenarios, start=1):
+            passing = grades[i] >= PASS_MARK
+            high_risk = probabilities[i] < 0.6
+            results.append({
+                'name': scenario.get('name') or f'Scenario {i}',
+                'changes': scenario['changes'],
+                'mean_predicted_grade': float(grades[i].mean()),
+                'mean_grade_change': float((grades[i] - base_grades).mean()),
+                'mean_pass_probability_change': float((probabilities[i] - base_probabilities).mean()),
+                'predicted_passing': int(passing.sum()),
+                'newly_passing': int((passing & ~base_passing).sum()),
+                'newly_failing': int((base_passing & ~passing).sum()),
+                'high_risk': int(high_risk.sum()),
+                'leaving_high_risk': int((base_high_risk & ~high_risk).sum())
+            })
+        
+        return {
+            'students': n,
+            'baseline': {
+                'mean_predicted_grade': float(base_grades.mean()),
+                'mean_pass_probability': float(base_probabilities.mean()),
+                'predicted_passing': int(base_passing.sum()),
+                'high_risk': int(base_high_risk.sum())
+            },
+            'scenarios': results
+        }
+    
+    def _parse_scenario(self, scenario, features):
+        """Validate one scenario into (column index, operation, value) triples"""
+        if not isinstance(scenario, dict) or not isinstance(scenario.get('changes'), dict) or not scenario['changes']:
+            raise ValueError("Each scenario needs a non-empty 'changes' object")
+        parsed = []
+        for feature, change in scenario['changes'].items():
+            if feature not in features:
+                raise ValueError(f"Unknown feature '{feature}'. Available: {', '.join(features)}")
+            if not isinstance(change, dict) or len(change) != 1:
+                raise ValueError(f"Change for '{feature}' must be one of {{'add'|'multiply'|'set': number}}")
+            (op, value), = change.items()
+            if op not in SIMULATION_OPERATIONS or isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Change for '{feature}' must be one of {{'add'|'multiply'|'set': number}}")
+            parsed.append((features.index(feature), op, value))
+        return parsed
+    
+    def _cohort_mask(self, df, cohort):
+        """Boolean row mask for student_ids and {'min', 'max'} column ranges"""
+        mask = np.ones(len(df), dtype=bool)
+        for key, condition in cohort.items():
+            if key == 'student_ids':
+                if not isinstance(condition, list) or not all(isinstance(value, (str, int)) for value in condition):
+                    raise ValueError("student_ids must be a list of student IDs")
+                if 'student_id' not in df.columns:
+                    raise ValueError("Dataset has no student_id column")
+                mask &= df['student_id'].isin(condition).to_numpy()
+            elif key in df.columns and isinstance(condition, dict) and set(condition) <= {'min', 'max'}:
+                for bound in condition.values():
+                    if bound is not None and (isinstance(bound, bool) or not isinstance(bound, (int, float))):
+                        raise ValueError(f"Cohort range for '{key}' needs numeric 'min'/'max' values")
+                values = pd.to_numeric(df[key], errors='coerce').to_numpy(dtype=float)
+                if condition.get('min') is not None:
+                    mask &= values >= condition['min']
+                if condition.get('max') is not None:
+                    mask &= values <= condition['max']
+            else:
+                raise ValueError(f"Unsupported cohort filter '{key}'")
+        return mask
     
     def _categorize_risk(self, pass_probability):
         """Categorize student risk level"""
@@ -148,6 +581,7 @@ class PerformancePredictor:
         else:
             return 'High'
     
+    @_locked
     def get_feature_importance(self):
         """Get feature importance from the regression model"""
         if not self.is_trained:
@@ -165,6 +599,7 @@ class PerformancePredictor:
         """Return model accuracy metrics"""
         return self.model_accuracy
     
+    @_locked
     def save_model(self, filepath='models/'):
         """Save trained model to disk"""
         if not self.is_trained:
@@ -173,19 +608,83 @@ class PerformancePredictor:
         os.makedirs(filepath, exist_ok=True)
         joblib.dump(self.regression_model, os.path.join(filepath, 'regression_model.pkl'))
         joblib.dump(self.classification_model, os.path.join(filepath, 'classification_model.pkl'))
-        joblib.dump(self.scaler, os.path.join(filepath, 'scaler.pkl'))
+        joblib.dump(self.pipeline, os.path.join(filepath, 'feature_pipeline.pkl'))
     
+    @_locked
     def load_model(self, filepath='models/'):
         """Load trained model from disk"""
         self.regression_model = joblib.load(os.path.join(filepath, 'regression_model.pkl'))
         self.classification_model = joblib.load(os.path.join(filepath, 'classification_model.pkl'))
-        self.scaler = joblib.load(os.path.join(filepath, 'scaler.pkl'))
+        self.pipeline = joblib.load(os.path.join(filepath, 'feature_pipeline.pkl'))
+        self.trained_features = self.pipeline.features
         self.is_trained = True
     
+    @_locked
     def reset(self):
         """Reset the model"""
         self.regression_model = None
         self.classification_model = None
-        self.scaler = StandardScaler()
+        self.pipeline = FeaturePipeline(self.feature_columns)
         self.is_trained = False
         self.model_accuracy = {}
+        self.best_params = {}
+
+
+class TuningJobManager:
+    """Runs PerformancePredictor.tune as background jobs with pollable status
+    
+    Each job tunes and retrains a fresh predictor, then hands it to
+    on_complete(job, predictor), which decides whether to adopt it (for
+    example only if the dataset has not changed meanwhile). One job runs
+    at a time; starting another while one is running returns the running
+    job.
+    """
+    
+    def __init__(self, on_complete):
+        self.on_complete = on_complete
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def status(self, job_id):
+        """Public view of a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def start(self, df, time_budget_minutes=None, dataset_version=None):
+        """Start tuning df in a background thread and return the job's status"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job['state'] == 'running':
+                    return dict(job)
+            
+            job = {
+                'job_id': uuid.uuid4().hex,
+                'state': 'running',
+                'time_budget_minutes': time_budget_minutes,
+                'dataset_version': dataset_version,
+                'started_at': time.time(),
+                'finished_at': None,
+                'applied': False,
+                'result': None,
+                'error': None
+            }
+            self._jobs[job['job_id']] = job
+            # Forget the oldest finished jobs
+            while len(self._jobs) > MAX_TUNING_JOBS:
+                self._jobs.pop(next(iter(self._jobs)))
+        
+        thread = threading.Thread(target=self._run, args=(job, df), daemon=True)
+        thread.start()
+        return dict(job)
+    
+    def _run(self, job, df):
+        predictor = PerformancePredictor()
+        try:
+            job['result'] = predictor.tune(df, time_budget_minutes=job['time_budget_minutes'])
+            job['applied'] = bool(self.on_complete(job, predictor))
+            job['state'] = 'complete'
+        except Exception as e:
+            job['state'] = 'error'
+            job['error'] = str(e)
+        job['finished_at'] = time.time()
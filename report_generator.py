@@ -1,7 +1,10 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from io import BytesIO
 import os
+import threading
+from xml.sax.saxutils import escape
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.chart import BarChart, PieChart, Reference
@@ -13,20 +16,85 @@ from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from derived_facts import get_derived_facts, percentile_ranks, SUBJECT_COLUMNS, BAND_LABELS
+
+HEADER_COLOR = colors.HexColor('#366092')
+
+
+class PdfStyles:
+    """Paragraph and table styles for PDF reports, built once per process"""
+    
+    _instance = None
+    
+    def __init__(self):
+        self.sheet = getSampleStyleSheet()
+        self.normal = self.sheet['Normal']
+        
+        self.title = ParagraphStyle(
+            'CustomTitle',
+            parent=self.sheet['Heading1'],
+            fontSize=24,
+            textColor=HEADER_COLOR,
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        
+        self.heading = ParagraphStyle(
+            'CustomHeading',
+            parent=self.sheet['Heading2'],
+            fontSize=16,
+            textColor=HEADER_COLOR,
+            spaceAfter=12,
+            spaceBefore=12
+        )
+        
+        self.card_title = ParagraphStyle(
+            'CardTitle',
+            parent=self.title,
+            fontSize=18,
+            spaceAfter=12
+        )
+        
+        self.left_table = self._table_style('LEFT', 12)
+        self.center_table = self._table_style('CENTER', 10)
+    
+    @staticmethod
+    def _table_style(alignment, header_font_size):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), HEADER_COLOR),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), alignment),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+    
+    @classmethod
+    def get(cls):
+        """Return the process-wide style set, creating it on first use"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
 
 class ReportGenerator:
     """Generate reports in Excel and PDF formats"""
     
-    def __init__(self):
-        self.output_dir = 'reports'
+    def __init__(self, output_dir='reports'):
+        self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
-        os.makedirs('temp_charts', exist_ok=True)
+        # Chart figures are created once per thread and redrawn for every report;
+        # a Figure must not be drawn from two request threads at once
+        self._local = threading.local()
     
-    def generate_excel_report(self, df):
+    def generate_excel_report(self, df, filepath=None):
         """Generate comprehensive Excel report with multiple sheets"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filepath = os.path.join(self.output_dir, f'student_analytics_{timestamp}.xlsx')
+        if filepath is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filepath = os.path.join(self.output_dir, f'student_analytics_{timestamp}.xlsx')
         
         with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
             # Sheet 1: Raw Data
@@ -49,46 +117,49 @@ class ReportGenerator:
     
     def _create_summary_sheet(self, df, writer):
         """Create summary statistics sheet"""
+        facts = get_derived_facts(df)
         summary_data = []
         
         # Overall statistics
         summary_data.append(['OVERALL STATISTICS', ''])
-        summary_data.append(['Total Students', len(df)])
+        summary_data.append(['Total Students', facts.total_students])
         
-        if 'average_grade' in df.columns:
-            summary_data.append(['Average Grade', f"{df['average_grade'].mean():.2f}"])
-            summary_data.append(['Median Grade', f"{df['average_grade'].median():.2f}"])
-            summary_data.append(['Highest Grade', f"{df['average_grade'].max():.2f}"])
-            summary_data.append(['Lowest Grade', f"{df['average_grade'].min():.2f}"])
+        if 'average_grade' in facts.stats:
+            grade_stats = facts.stats['average_grade']
+            summary_data.append(['Average Grade', f"{grade_stats['mean']:.2f}"])
+            summary_data.append(['Median Grade', f"{grade_stats['median']:.2f}"])
+            summary_data.append(['Highest Grade', f"{grade_stats['max']:.2f}"])
+            summary_data.append(['Lowest Grade', f"{grade_stats['min']:.2f}"])
         
         summary_data.append(['', ''])
         summary_data.append(['SUBJECT AVERAGES', ''])
         
         # Subject averages
-        subject_cols = ['math', 'science', 'english', 'history']
-        for subject in subject_cols:
-            if subject in df.columns:
-                summary_data.append([subject.capitalize(), f"{df[subject].mean():.2f}"])
+        for subject in SUBJECT_COLUMNS:
+            if subject in facts.stats:
+                summary_data.append([subject.capitalize(), f"{facts.stats[subject]['mean']:.2f}"])
         
         summary_df = pd.DataFrame(summary_data, columns=['Metric', 'Value'])
         summary_df.to_excel(writer, sheet_name='Summary', index=False)
     
     def _create_subject_analysis_sheet(self, df, writer):
         """Create subject-wise analysis sheet"""
-        subject_cols = ['math', 'science', 'english', 'history']
+        facts = get_derived_facts(df)
         analysis_data = []
         
-        for subject in subject_cols:
-            if subject in df.columns:
+        for subject in SUBJECT_COLUMNS:
+            if subject in facts.stats:
+                subject_stats = facts.stats[subject]
+                thresholds = facts.subject_thresholds[subject]
                 analysis_data.append({
                     'Subject': subject.capitalize(),
-                    'Mean': f"{df[subject].mean():.2f}",
-                    'Median': f"{df[subject].median():.2f}",
-                    'Std Dev': f"{df[subject].std():.2f}",
-                    'Min': df[subject].min(),
-                    'Max': df[subject].max(),
-                    'Above 80': len(df[df[subject] >= 80]),
-                    'Below 60': len(df[df[subject] < 60])
+                    'Mean': f"{subject_stats['mean']:.2f}",
+                    'Median': f"{subject_stats['median']:.2f}",
+                    'Std Dev': f"{subject_stats['std']:.2f}",
+                    'Min': subject_stats['min'],
+                    'Max': subject_stats['max'],
+                    'Above 80': thresholds['above_80'],
+                    'Below 60': thresholds['below_60']
                 })
         
         analysis_df = pd.DataFrame(analysis_data)
@@ -99,22 +170,13 @@ class ReportGenerator:
         if 'average_grade' not in df.columns:
             return
         
-        # Categorize students
-        excellent = df[df['average_grade'] >= 90]
-        good = df[(df['average_grade'] >= 80) & (df['average_grade'] < 90)]
-        average = df[(df['average_grade'] >= 70) & (df['average_grade'] < 80)]
-        below_avg = df[(df['average_grade'] >= 60) & (df['average_grade'] < 70)]
-        failing = df[df['average_grade'] < 60]
-        
-        # Create summary
-        perf_data = [
-            ['Category', 'Count', 'Percentage'],
-            ['Excellent (90+)', len(excellent), f"{len(excellent)/len(df)*100:.1f}%"],
-            ['Good (80-89)', len(good), f"{len(good)/len(df)*100:.1f}%"],
-            ['Average (70-79)', len(average), f"{len(average)/len(df)*100:.1f}%"],
-            ['Below Average (60-69)', len(below_avg), f"{len(below_avg)/len(df)*100:.1f}%"],
-            ['Failing (<60)', len(failing), f"{len(failing)/len(df)*100:.1f}%"]
-        ]
+        facts = get_derived_facts(df)
+        total = facts.total_students
+        
+        # Create summary from the precomputed performance bands
+        perf_data = [['Category', 'Count', 'Percentage']]
+        for label, count in facts.band_table():
+            perf_data.append([label, count, f"{count/total*100:.1f}%"])
         
         perf_df = pd.DataFrame(perf_data[1:], columns=perf_data[0])
         perf_df.to_excel(writer, sheet_name='Performance Categories', index=False)
@@ -130,38 +192,22 @@ class ReportGenerator:
                 cell.font = header_font
                 cell.alignment = Alignment(horizontal='center')
     
-    def generate_pdf_report(self, df):
+    def generate_pdf_report(self, df, filepath=None):
         """Generate comprehensive PDF report"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filepath = os.path.join(self.output_dir, f'student_analytics_{timestamp}.pdf')
+        if filepath is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filepath = os.path.join(self.output_dir, f'student_analytics_{timestamp}.pdf')
         
         # Create PDF document
         doc = SimpleDocTemplate(filepath, pagesize=letter)
         story = []
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#366092'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
+        styles = PdfStyles.get()
+        title_style = styles.title
+        heading_style = styles.heading
         
         # Title
         story.append(Paragraph('Student Performance Analytics Report', title_style))
-        story.append(Paragraph(f'Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}', styles['Normal']))
+        story.append(Paragraph(f'Generated: {datetime.now().strftime("%B %d, %Y at %I:%M %p")}', styles.normal))
         story.append(Spacer(1, 0.3*inch))
         
         # Executive Summary
@@ -171,23 +217,14 @@ class ReportGenerator:
         The analysis includes overall performance metrics, subject-wise breakdowns, and predictive insights
         to identify at-risk students and areas for improvement.
         """
-        story.append(Paragraph(summary_text, styles['Normal']))
+        story.append(Paragraph(summary_text, styles.normal))
         story.append(Spacer(1, 0.2*inch))
         
         # Overall Statistics
         story.append(Paragraph('Overall Statistics', heading_style))
         stats_data = self._prepare_stats_table(df)
         stats_table = Table(stats_data, colWidths=[3*inch, 2*inch])
-        stats_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        stats_table.setStyle(styles.left_table)
         story.append(stats_table)
         story.append(Spacer(1, 0.3*inch))
         
@@ -195,86 +232,174 @@ class ReportGenerator:
         story.append(Paragraph('Subject-wise Performance', heading_style))
         subject_data = self._prepare_subject_table(df)
         subject_table = Table(subject_data)
-        subject_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        subject_table.setStyle(styles.center_table)
         story.append(subject_table)
         story.append(Spacer(1, 0.3*inch))
         
         # Add charts
-        chart_files = self._generate_charts(df)
-        if chart_files:
+        charts = self._generate_charts(df)
+        if charts:
             story.append(PageBreak())
             story.append(Paragraph('Visual Analysis', heading_style))
-            for chart_file in chart_files:
-                if os.path.exists(chart_file):
-                    img = Image(chart_file, width=6*inch, height=4*inch)
-                    story.append(img)
-                    story.append(Spacer(1, 0.2*inch))
+            for chart in charts:
+                img = Image(chart, width=6*inch, height=4*inch)
+                story.append(img)
+                story.append(Spacer(1, 0.2*inch))
         
         # Performance Distribution
         story.append(PageBreak())
         story.append(Paragraph('Performance Distribution', heading_style))
         perf_data = self._prepare_performance_table(df)
         perf_table = Table(perf_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
-        perf_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#366092')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        perf_table.setStyle(styles.center_table)
         story.append(perf_table)
         
         # Build PDF
         doc.build(story)
         
-        # Cleanup temporary chart files
-        for chart_file in chart_files:
-            if os.path.exists(chart_file):
-                os.remove(chart_file)
+        return filepath
+    
+    def generate_report_cards(self, df, filepath=None, separate=False):
+        """Generate per-student report cards
         
+        By default all students are rendered into one multi-page PDF and its
+        path is returned. With separate=True one small PDF is written per
+        student into a directory (filepath, or a timestamped folder under
+        output_dir) and the list of paths is returned.
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        styles = PdfStyles.get()
+        cards = self._prepare_report_cards(df)
+        
+        if separate:
+            card_dir = filepath or os.path.join(self.output_dir, f'report_cards_{timestamp}')
+            os.makedirs(card_dir, exist_ok=True)
+            paths = []
+            used = set()
+            for row, card in enumerate(cards):
+                # IDs that sanitize to the same name (A/1 and A_1) or repeat get a row suffix
+                file_id = card['file_id'] or 'student'
+                suffix = 0
+                while file_id.lower() in used:
+                    suffix += 1
+                    file_id = f"{card['file_id'] or 'student'}_row{row + 1}" + (f'_{suffix}' if suffix > 1 else '')
+                used.add(file_id.lower())
+                card_path = os.path.join(card_dir, f"{file_id}.pdf")
+                SimpleDocTemplate(card_path, pagesize=letter).build(self._report_card_story(card, styles))
+                paths.append(card_path)
+            return paths
+        
+        if filepath is None:
+            filepath = os.path.join(self.output_dir, f'report_cards_{timestamp}.pdf')
+        story = []
+        for i, card in enumerate(cards):
+            if i:
+                story.append(PageBreak())
+            story.extend(self._report_card_story(card, styles))
+        SimpleDocTemplate(filepath, pagesize=letter).build(story)
         return filepath
     
+    def _prepare_report_cards(self, df):
+        """Compute every student's card contents in one vectorized pass"""
+        facts = get_derived_facts(df)
+        subjects = [col for col in SUBJECT_COLUMNS if col in facts.stats]
+        grades = df[subjects].to_numpy(dtype=float)
+        percentiles = np.column_stack([percentile_ranks(grades[:, i]) for i in range(len(subjects))]) \
+            if subjects else grades
+        personal_avg = np.nanmean(grades, axis=1) if subjects else np.full(len(df), np.nan)
+        class_avg = [facts.stats[col]['mean'] for col in subjects]
+        
+        ids = df['student_id'].astype(str).tolist() if 'student_id' in df.columns else [str(i + 1) for i in range(len(df))]
+        names = df['name'].astype(str).tolist() if 'name' in df.columns else ['N/A'] * len(df)
+        overall = df['average_grade'].to_numpy(dtype=float) if 'average_grade' in df.columns else None
+        attendance = df['attendance'].to_numpy(dtype=float) if 'attendance' in df.columns else None
+        study_hours = df['study_hours'].to_numpy(dtype=float) if 'study_hours' in df.columns else None
+        
+        cards = []
+        for row in range(len(df)):
+            cards.append({
+                'student_id': ids[row],
+                'file_id': ''.join(c if c.isalnum() or c in '-_' else '_' for c in ids[row]),
+                'name': names[row],
+                'subjects': [
+                    (subject.capitalize(), grades[row, i], percentiles[row, i], class_avg[i])
+                    for i, subject in enumerate(subjects)
+                ],
+                'strengths': [s.capitalize() for i, s in enumerate(subjects) if grades[row, i] > personal_avg[row] + 5],
+                'weaknesses': [s.capitalize() for i, s in enumerate(subjects) if grades[row, i] < personal_avg[row] - 5],
+                'overall': None if overall is None else overall[row],
+                'band': None if facts.band_codes is None or facts.band_codes[row] < 0 else BAND_LABELS[facts.band_codes[row]],
+                'attendance': None if attendance is None else attendance[row],
+                'study_hours': None if study_hours is None else study_hours[row]
+            })
+        return cards
+    
+    def _report_card_story(self, card, styles):
+        """Flowables for a single student's report card"""
+        story = [
+            Paragraph('Student Report Card', styles.card_title),
+            Paragraph(f"<b>{escape(card['name'])}</b> ({escape(card['student_id'])})", styles.normal),
+            Spacer(1, 0.2*inch)
+        ]
+        
+        data = [['Subject', 'Grade', 'Percentile', 'Class Average']]
+        for subject, grade, percentile, class_avg in card['subjects']:
+            data.append([subject, f"{grade:.1f}", f"{percentile:.0f}", f"{class_avg:.1f}"])
+        if card['overall'] is not None:
+            data.append(['Overall', f"{card['overall']:.2f}", '', ''])
+        table = Table(data, colWidths=[1.8*inch, 1.2*inch, 1.2*inch, 1.5*inch])
+        table.setStyle(styles.center_table)
+        story.append(table)
+        story.append(Spacer(1, 0.2*inch))
+        
+        details = []
+        if card['band'] is not None:
+            details.append(f"Performance category: {card['band']}")
+        if card['attendance'] is not None:
+            details.append(f"Attendance: {card['attendance']:.1f}%")
+        if card['study_hours'] is not None:
+            details.append(f"Study hours per week: {card['study_hours']:.1f}")
+        if card['strengths']:
+            details.append(f"Strengths: {', '.join(card['strengths'])}")
+        if card['weaknesses']:
+            details.append(f"Needs attention: {', '.join(card['weaknesses'])}")
+        for line in details:
+            story.append(Paragraph(line, styles.normal))
+        return story
+    
     def _prepare_stats_table(self, df):
         """Prepare statistics table data for PDF"""
+        facts = get_derived_facts(df)
         data = [['Metric', 'Value']]
-        data.append(['Total Students', str(len(df))])
+        data.append(['Total Students', str(facts.total_students)])
         
-        if 'average_grade' in df.columns:
-            data.append(['Average Grade', f"{df['average_grade'].mean():.2f}"])
-            data.append(['Median Grade', f"{df['average_grade'].median():.2f}"])
-            data.append(['Standard Deviation', f"{df['average_grade'].std():.2f}"])
+        if 'average_grade' in facts.stats:
+            grade_stats = facts.stats['average_grade']
+            data.append(['Average Grade', f"{grade_stats['mean']:.2f}"])
+            data.append(['Median Grade', f"{grade_stats['median']:.2f}"])
+            data.append(['Standard Deviation', f"{grade_stats['std']:.2f}"])
         
-        if 'attendance' in df.columns:
-            data.append(['Average Attendance', f"{df['attendance'].mean():.1f}%"])
+        if 'attendance' in facts.stats:
+            data.append(['Average Attendance', f"{facts.stats['attendance']['mean']:.1f}%"])
         
         return data
     
     def _prepare_subject_table(self, df):
         """Prepare subject analysis table for PDF"""
-        subject_cols = ['math', 'science', 'english', 'history']
+        facts = get_derived_facts(df)
         data = [['Subject', 'Mean', 'Median', 'Std Dev', 'Above 80%', 'Below 60%']]
         
-        for subject in subject_cols:
-            if subject in df.columns:
+        for subject in SUBJECT_COLUMNS:
+            if subject in facts.stats:
+                subject_stats = facts.stats[subject]
+                thresholds = facts.subject_thresholds[subject]
                 data.append([
                     subject.capitalize(),
-                    f"{df[subject].mean():.2f}",
-                    f"{df[subject].median():.2f}",
-                    f"{df[subject].std():.2f}",
-                    str(len(df[df[subject] >= 80])),
-                    str(len(df[df[subject] < 60]))
+                    f"{subject_stats['mean']:.2f}",
+                    f"{subject_stats['median']:.2f}",
+                    f"{subject_stats['std']:.2f}",
+                    str(thresholds['above_80']),
+                    str(thresholds['below_60'])
                 ])
         
         return data
@@ -284,56 +409,62 @@ class ReportGenerator:
         if 'average_grade' not in df.columns:
             return [['Category', 'Count', 'Percentage']]
         
-        total = len(df)
+        facts = get_derived_facts(df)
+        total = facts.total_students
         data = [['Performance Category', 'Student Count', 'Percentage']]
         
-        categories = [
-            ('Excellent (90+)', df['average_grade'] >= 90),
-            ('Good (80-89)', (df['average_grade'] >= 80) & (df['average_grade'] < 90)),
-            ('Average (70-79)', (df['average_grade'] >= 70) & (df['average_grade'] < 80)),
-            ('Below Average (60-69)', (df['average_grade'] >= 60) & (df['average_grade'] < 70)),
-            ('Failing (<60)', df['average_grade'] < 60)
-        ]
-        
-        for category, condition in categories:
-            count = len(df[condition])
+        for category, count in facts.band_table():
             percentage = f"{count/total*100:.1f}%"
             data.append([category, str(count), percentage])
         
         return data
     
+    def _get_chart_axes(self, name):
+        """Return a cleared axes on the reusable figure for this chart"""
+        figures = getattr(self._local, 'figures', None)
+        if figures is None:
+            figures = self._local.figures = {}
+        fig = figures.get(name)
+        if fig is None:
+            fig = Figure(figsize=(10, 6))
+            figures[name] = fig
+        fig.clear()
+        return fig, fig.add_subplot()
+    
+    def _render_chart(self, fig):
+        """Render a figure to an in-memory PNG"""
+        buffer = BytesIO()
+        fig.savefig(buffer, format='png', bbox_inches='tight', dpi=100)
+        buffer.seek(0)
+        return buffer
+    
     def _generate_charts(self, df):
-        """Generate charts for PDF report"""
-        chart_files = []
+        """Generate charts for PDF report as in-memory PNG images"""
+        charts = []
         
         try:
             # Chart 1: Subject averages
-            subject_cols = ['math', 'science', 'english', 'history']
+            subject_cols = SUBJECT_COLUMNS
             if all(col in df.columns for col in subject_cols):
-                fig, ax = plt.subplots(figsize=(10, 6))
-                averages = [df[col].mean() for col in subject_cols]
+                fig, ax = self._get_chart_axes('subject_averages')
+                stats = get_derived_facts(df).stats
+                averages = [stats[col]['mean'] for col in subject_cols]
                 ax.bar(subject_cols, averages, color='#366092')
                 ax.set_ylabel('Average Score')
                 ax.set_title('Subject-wise Average Performance')
                 ax.set_ylim(0, 100)
-                chart_file = 'temp_charts/subject_averages.png'
-                plt.savefig(chart_file, bbox_inches='tight', dpi=100)
-                plt.close()
-                chart_files.append(chart_file)
+                charts.append(self._render_chart(fig))
             
             # Chart 2: Grade distribution
             if 'average_grade' in df.columns:
-                fig, ax = plt.subplots(figsize=(10, 6))
+                fig, ax = self._get_chart_axes('grade_distribution')
                 ax.hist(df['average_grade'], bins=20, color='#4CAF50', edgecolor='black')
                 ax.set_xlabel('Grade')
                 ax.set_ylabel('Number of Students')
                 ax.set_title('Grade Distribution')
-                chart_file = 'temp_charts/grade_distribution.png'
-                plt.savefig(chart_file, bbox_inches='tight', dpi=100)
-                plt.close()
-                chart_files.append(chart_file)
+                charts.append(self._render_chart(fig))
         
         except Exception as e:
             print(f"Error generating charts: {e}")
         
-        return chart_files
+        return charts
@@ -30,5 +30,11 @@ echo "Dashboard will be available at: http://localhost:5000"
 echo "Press CTRL+C to stop the server"
 echo ""
 
-# Run the Flask app
-python app.py
+# Run with gunicorn's threaded worker when it is installed, so open dashboard
+# event streams and uploads do not block other requests; otherwise use
+# Flask's (also threaded) development server
+if command -v gunicorn >/dev/null 2>&1; then
+    gunicorn --worker-class gthread --workers 1 --threads 16 -b 0.0.0.0:5000 app:app
+else
+    python app.py
+fi
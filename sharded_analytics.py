@@ -0,0 +1,497 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from derived_facts import (
+    SUBJECT_COLUMNS, BAND_KEYS, LETTER_LABELS,
+    compute_band_codes, count_bands, count_letters, count_subject_thresholds
+)
+from json_encoding import dumps_text
+
+SUMMARY_COLUMNS = SUBJECT_COLUMNS + ['average_grade', 'attendance']
+TEXT_COLUMNS = ['student_id', 'name']
+TOP_PERFORMERS = 10
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch-style)
+
+    Values are counted in logarithmic buckets, so any quantile is returned
+    within relative_accuracy of the true value and sketches built on
+    different shards merge exactly by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.001):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, values):
+        """Add an array of values, ignoring NaNs"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.zero_count += int(np.count_nonzero(values == 0))
+        self._add_to_store(self.positive, values[values > 0])
+        self._add_to_store(self.negative, -values[values < 0])
+
+    def _add_to_store(self, store, magnitudes):
+        if len(magnitudes) == 0:
+            return
+        indexes = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        keys, counts = np.unique(indexes, return_counts=True)
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def merge(self, other):
+        """Fold another sketch with the same accuracy into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _value_at_rank(self, rank):
+        """Value of the rank-th smallest element (0-based)"""
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive)) if self.positive else 0.0
+
+    def quantile(self, q):
+        """Approximate quantile using linear interpolation between ranks, like pandas"""
+        if self.count == 0:
+            return float('nan')
+        position = q * (self.count - 1)
+        lower = int(np.floor(position))
+        upper = int(np.ceil(position))
+        low_value = self._value_at_rank(lower)
+        if upper == lower:
+            return low_value
+        return low_value + (position - lower) * (self._value_at_rank(upper) - low_value)
+
+
+class ShardAggregate:
+    """Partial analytics for one shard that merge exactly with other shards"""
+
+    def __init__(self, numeric_columns, relative_accuracy=0.001):
+        self.numeric_columns = list(numeric_columns)
+        k = len(self.numeric_columns)
+        self.total_students = 0
+
+        # Per-column moments (count, mean, sum of squared deviations) and extremes
+        self.count = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.sketches = {col: QuantileSketch(relative_accuracy) for col in self.numeric_columns}
+
+        # Pairwise co-moments over rows where both columns are present
+        self.pair_count = np.zeros((k, k))
+        self.pair_mean_x = np.zeros((k, k))
+        self.pair_mean_y = np.zeros((k, k))
+        self.pair_m2_x = np.zeros((k, k))
+        self.pair_m2_y = np.zeros((k, k))
+        self.pair_cov = np.zeros((k, k))
+
+        self.band_counts = np.zeros(len(BAND_KEYS), dtype=np.int64)
+        self.letter_counts = np.zeros(len(LETTER_LABELS), dtype=np.int64)
+        self.histogram = np.zeros(10, dtype=np.int64)
+        self.subject_thresholds = {}
+        self.top_performers = []
+
+    @classmethod
+    def from_columns(cls, columns, numeric_columns, rows, relative_accuracy=0.001):
+        """Aggregate one shard given a mapping of column name to array"""
+        agg = cls(numeric_columns, relative_accuracy)
+        agg.total_students = rows
+        if rows == 0:
+            return agg
+
+        data = np.column_stack([columns[col] for col in agg.numeric_columns]) if agg.numeric_columns else np.empty((rows, 0))
+        valid = ~np.isnan(data)
+        for i, col in enumerate(agg.numeric_columns):
+            values = data[valid[:, i], i]
+            if len(values):
+                agg.count[i] = len(values)
+                agg.mean[i] = values.mean()
+                agg.m2[i] = ((values - agg.mean[i]) ** 2).sum()
+                agg.min[i] = values.min()
+                agg.max[i] = values.max()
+            agg.sketches[col].add(values)
+
+        for i in range(len(agg.numeric_columns)):
+            for j in range(i, len(agg.numeric_columns)):
+                both = valid[:, i] & valid[:, j]
+                n = int(np.count_nonzero(both))
+                if n == 0:
+                    continue
+                x = data[both, i]
+                y = data[both, j]
+                mx, my = x.mean(), y.mean()
+                dx, dy = x - mx, y - my
+                agg.pair_count[i, j] = n
+                agg.pair_mean_x[i, j], agg.pair_mean_y[i, j] = mx, my
+                agg.pair_m2_x[i, j], agg.pair_m2_y[i, j] = (dx * dx).sum(), (dy * dy).sum()
+                agg.pair_cov[i, j] = (dx * dy).sum()
+
+        if 'average_grade' in columns:
+            grades = np.asarray(columns['average_grade'], dtype=float)
+            agg.band_counts = count_bands(compute_band_codes(grades)).astype(np.int64)
+            agg.letter_counts = count_letters(grades).astype(np.int64)
+            present = grades[~np.isnan(grades)]
+            agg.histogram = np.histogram(present, bins=10, range=(0, 100))[0].astype(np.int64)
+
+            if 'student_id' in columns:
+                order = np.argsort(-np.nan_to_num(grades, nan=-np.inf), kind='stable')[:TOP_PERFORMERS]
+                names = columns.get('name')
+                agg.top_performers = [
+                    {
+                        'student_id': str(columns['student_id'][i]),
+                        'name': str(names[i]) if names is not None else 'N/A',
+                        'average_grade': float(grades[i])
+                    }
+                    for i in order if not np.isnan(grades[i])
+                ]
+
+        for subject in SUBJECT_COLUMNS:
+            if subject in columns:
+                agg.subject_thresholds[subject] = count_subject_thresholds(columns[subject])
+
+        return agg
+
+    def merge(self, other):
+        """Combine another shard's aggregate into this one (Chan et al. parallel moments)"""
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.mean = np.where(n > 0, self.mean + delta * other.count / n, 0.0)
+            self.m2 = np.where(n > 0, self.m2 + other.m2 + delta ** 2 * self.count * other.count / n, 0.0)
+        self.count = n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for col in self.numeric_columns:
+            self.sketches[col].merge(other.sketches[col])
+
+        n = self.pair_count + other.pair_count
+        dx = other.pair_mean_x - self.pair_mean_x
+        dy = other.pair_mean_y - self.pair_mean_y
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.pair_count * other.pair_count / n, 0.0)
+            self.pair_mean_x = np.where(n > 0, self.pair_mean_x + dx * other.pair_count / n, 0.0)
+            self.pair_mean_y = np.where(n > 0, self.pair_mean_y + dy * other.pair_count / n, 0.0)
+        self.pair_m2_x += other.pair_m2_x + dx * dx * weight
+        self.pair_m2_y += other.pair_m2_y + dy * dy * weight
+        self.pair_cov += other.pair_cov + dx * dy * weight
+        self.pair_count = n
+
+        self.total_students += other.total_students
+        self.band_counts += other.band_counts
+        self.letter_counts += other.letter_counts
+        self.histogram += other.histogram
+        for subject, counts in other.subject_thresholds.items():
+            merged = self.subject_thresholds.setdefault(subject, {key: 0 for key in counts})
+            for key, value in counts.items():
+                merged[key] += value
+
+        combined = self.top_performers + other.top_performers
+        self.top_performers = sorted(combined, key=lambda s: s['average_grade'], reverse=True)[:TOP_PERFORMERS]
+        return self
+
+    def _correlation(self, i, j):
+        i, j = min(i, j), max(i, j)
+        if self.pair_count[i, j] < 2:
+            return float('nan')
+        denom = np.sqrt(self.pair_m2_x[i, j] * self.pair_m2_y[i, j])
+        if not denom > 0:
+            return float('nan')  # Constant column, as in DataFrame.corr()
+        return 1.0 if i == j else float(self.pair_cov[i, j] / denom)
+
+    def _column_stats(self, i):
+        col = self.numeric_columns[i]
+        n = self.count[i]
+        sketch = self.sketches[col]
+        return {
+            'mean': float(self.mean[i]) if n else float('nan'),
+            'median': float(sketch.quantile(0.5)),
+            'std': float(np.sqrt(self.m2[i] / (n - 1))) if n > 1 else float('nan'),
+            'min': float(self.min[i]) if n else float('nan'),
+            'max': float(self.max[i]) if n else float('nan'),
+            'q1': float(sketch.quantile(0.25)),
+            'q3': float(sketch.quantile(0.75))
+        }
+
+    def to_result(self):
+        """Build the same sections StudentAnalytics returns for a single frame"""
+        index = {col: i for i, col in enumerate(self.numeric_columns)}
+        has_grades = 'average_grade' in index
+
+        summary = {
+            'total_students': int(self.total_students),
+            'statistics': {
+                col: self._column_stats(index[col]) for col in self.numeric_columns if col in SUMMARY_COLUMNS
+            },
+            'grade_distribution': {},
+            'performance_categories': {}
+        }
+        if has_grades:
+            letters = sorted(zip(LETTER_LABELS, self.letter_counts.tolist()), key=lambda item: item[1], reverse=True)
+            summary['grade_distribution'] = {label: int(count) for label, count in letters}
+            bands = dict(zip(BAND_KEYS, self.band_counts.tolist()))
+            summary['performance_categories'] = {
+                key: int(bands[key]) for key in ['excellent', 'good', 'average', 'below_average', 'failing']
+            }
+
+        viz_data = {}
+        if all(col in index for col in SUBJECT_COLUMNS):
+            viz_data['subject_averages'] = {col: float(self.mean[index[col]]) for col in SUBJECT_COLUMNS}
+        if has_grades:
+            viz_data['grade_histogram'] = {
+                'counts': self.histogram.tolist(),
+                'bins': np.linspace(0, 100, 11).tolist()
+            }
+        # Scatter points are not returned for sharded runs; only the correlations
+        if 'attendance' in index and has_grades:
+            viz_data['attendance_vs_grade'] = {
+                'correlation': self._correlation(index['attendance'], index['average_grade'])
+            }
+        if has_grades and self.top_performers:
+            viz_data['top_performers'] = self.top_performers
+        if all(col in self.subject_thresholds for col in SUBJECT_COLUMNS):
+            viz_data['subject_distributions'] = {col: self.subject_thresholds[col] for col in SUBJECT_COLUMNS}
+        if 'study_hours' in index and has_grades:
+            viz_data['study_hours_impact'] = {
+                'correlation': self._correlation(index['study_hours'], index['average_grade'])
+            }
+
+        correlation = {
+            col_j: {col_i: self._correlation(i, j) for i, col_i in enumerate(self.numeric_columns)}
+            for j, col_j in enumerate(self.numeric_columns)
+        }
+
+        return {
+            'summary': summary,
+            'visualizations': viz_data,
+            'correlation_matrix': correlation
+        }
+
+
+class _TextColumn:
+    """Variable-length strings stored as a UTF-8 blob plus end offsets"""
+
+    def __init__(self, blob, ends):
+        self.blob = blob
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        start = self.ends[i - 1] if i > 0 else 0
+        return bytes(self.blob[start:self.ends[i]]).decode('utf-8')
+
+
+class _ColumnStore:
+    """Spills shards to disk as flat column files that workers memory-map
+
+    Each shard is a directory holding one raw binary file per column, so
+    workers receive only a path and read columns through np.memmap instead
+    of unpickling DataFrames. Text columns are a UTF-8 blob (.txt) with
+    int64 end offsets (.off), so strings keep their full length.
+    """
+
+    def __init__(self, root, numeric_columns, text_columns):
+        self.root = root
+        self.numeric_columns = numeric_columns
+        self.text_columns = text_columns
+        self.rows = {}
+        self.dirs = {}
+        self.labels = {}
+        self.text_bytes = {}
+
+    def append(self, key, frame):
+        if key not in self.dirs:
+            shard_dir = os.path.join(self.root, f'shard_{len(self.dirs):06d}')
+            os.makedirs(shard_dir)
+            self.dirs[key] = shard_dir
+            self.rows[key] = 0
+            self.text_bytes[key] = dict.fromkeys(self.text_columns, 0)
+            self.labels[key] = key
+        shard_dir = self.dirs[key]
+
+        for col in self.numeric_columns:
+            if col in frame.columns:
+                values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                values = np.full(len(frame), np.nan)
+            with open(os.path.join(shard_dir, f'{col}.f8'), 'ab') as fh:
+                values.tofile(fh)
+        for col in self.text_columns:
+            encoded = [value.encode('utf-8') for value in frame[col].astype(str)]
+            ends = np.cumsum([len(value) for value in encoded], dtype=np.int64) + self.text_bytes[key][col]
+            with open(os.path.join(shard_dir, f'{col}.txt'), 'ab') as fh:
+                fh.write(b''.join(encoded))
+            with open(os.path.join(shard_dir, f'{col}.off'), 'ab') as fh:
+                ends.tofile(fh)
+            if len(ends):
+                self.text_bytes[key][col] = int(ends[-1])
+        self.rows[key] += len(frame)
+
+    def shards(self):
+        return [(self.labels[key], self.dirs[key], self.rows[key]) for key in self.dirs]
+
+
+def _aggregate_shard(shard_dir, rows, numeric_columns, text_columns, relative_accuracy):
+    """Worker entry point: memory-map one shard's columns and aggregate them"""
+    columns = {}
+    if rows:
+        for col in numeric_columns:
+            columns[col] = np.memmap(os.path.join(shard_dir, f'{col}.f8'), dtype=np.float64, mode='r', shape=(rows,))
+        for col in text_columns:
+            ends = np.memmap(os.path.join(shard_dir, f'{col}.off'), dtype=np.int64, mode='r', shape=(rows,))
+            blob_path = os.path.join(shard_dir, f'{col}.txt')
+            # np.memmap cannot map an empty file
+            blob = np.memmap(blob_path, dtype=np.uint8, mode='r') if os.path.getsize(blob_path) else b''
+            columns[col] = _TextColumn(blob, ends)
+    return ShardAggregate.from_columns(columns, numeric_columns, rows, relative_accuracy)
+
+
+class ShardedAnalytics:
+    """Run StudentAnalytics aggregates over partitions of a dataset in a process pool"""
+
+    def __init__(self, shard_by='rows', shard_rows=1_000_000, school_column='school',
+                 workers=None, relative_accuracy=0.001, spill_dir=None):
+        if shard_by not in ('rows', 'school'):
+            raise ValueError("shard_by must be 'rows' or 'school'")
+        self.shard_by = shard_by
+        self.shard_rows = shard_rows
+        self.school_column = school_column
+        self.workers = workers or os.cpu_count()
+        self.relative_accuracy = relative_accuracy
+        self.spill_dir = spill_dir
+
+    def _iter_chunks(self, source):
+        """Yield DataFrame chunks from a DataFrame, CSV or Excel file"""
+        if isinstance(source, pd.DataFrame):
+            for start in range(0, len(source), self.shard_rows):
+                yield source.iloc[start:start + self.shard_rows]
+        elif str(source).endswith('.csv'):
+            yield from pd.read_csv(source, chunksize=self.shard_rows)
+        elif str(source).endswith(('.xlsx', '.xls')):
+            df = pd.read_excel(source)
+            for start in range(0, len(df), self.shard_rows):
+                yield df.iloc[start:start + self.shard_rows]
+        else:
+            raise ValueError("Unsupported file format. Use CSV or Excel")
+
+    def _partition(self, source, root):
+        """Write every chunk into the column store, keyed by row range or school"""
+        store = None
+        for chunk_index, chunk in enumerate(self._iter_chunks(source)):
+            if store is None:
+                numeric_columns = [
+                    col for col in chunk.select_dtypes(include=[np.number]).columns if col != self.school_column
+                ]
+                text_columns = [col for col in TEXT_COLUMNS if col in chunk.columns]
+                store = _ColumnStore(root, numeric_columns, text_columns)
+
+            if self.shard_by == 'rows':
+                store.append(chunk_index, chunk)
+            else:
+                if self.school_column not in chunk.columns:
+                    raise ValueError(f"Column '{self.school_column}' not found for school sharding")
+                for school, group in chunk.groupby(self.school_column, sort=False, dropna=False):
+                    store.append(str(school), group)
+        return store
+
+    def run(self, source):
+        """Aggregate the dataset and return summary, visualization and correlation sections"""
+        root = tempfile.mkdtemp(prefix='sharded_', dir=self.spill_dir)
+        try:
+            store = self._partition(source, root)
+            if store is None:
+                raise ValueError("Dataset is empty")
+
+            shards = store.shards()
+            merged = ShardAggregate(store.numeric_columns, self.relative_accuracy)
+            per_school = {}
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = {
+                    executor.submit(_aggregate_shard, shard_dir, rows, store.numeric_columns,
+                                    store.text_columns, self.relative_accuracy): label
+                    for label, shard_dir, rows in shards
+                }
+                for future in as_completed(futures):
+                    partial = future.result()
+                    if self.shard_by == 'school':
+                        per_school[futures[future]] = partial.to_result()['summary']
+                    merged.merge(partial)
+
+            result = merged.to_result()
+            result['shards'] = len(shards)
+            if self.shard_by == 'school':
+                result['schools'] = dict(sorted(per_school.items()))
+            return result
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def run_sharded_analytics(source, **kwargs):
+    """Convenience wrapper around ShardedAnalytics(**kwargs).run(source)"""
+    return ShardedAnalytics(**kwargs).run(source)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compute student analytics over a sharded dataset')
+    parser.add_argument('source', help='CSV or Excel file with student records')
+    parser.add_argument('--by', choices=['rows', 'school'], default='rows', help='Partition by row range or by school')
+    parser.add_argument('--school-column', default='school', help='Column identifying the school')
+    parser.add_argument('--shard-rows', type=int, default=1_000_000, help='Rows per shard / read chunk')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--spill-dir', default=None, help='Directory for memory-mapped shard columns')
+    parser.add_argument('--output', '-o', default=None, help='Write JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    result = run_sharded_analytics(
+        args.source,
+        shard_by=args.by,
+        shard_rows=args.shard_rows,
+        school_column=args.school_column,
+        workers=args.workers,
+        spill_dir=args.spill_dir
+    )
+
+    payload = dumps_text(result, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(payload)
+    else:
+        sys.stdout.write(payload + '\n')
+
+
+if __name__ == '__main__':
+    main()
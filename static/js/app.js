@@ -2,6 +2,8 @@
 let chartsInitialized = false;
 let allPredictions = [];
 let charts = {};
+let dashboardEvents = null;
+let analyticsLoaded = false;
 
 // Tab switching
 function openTab(evt, tabName) {
@@ -21,23 +23,120 @@ function openTab(evt, tabName) {
     // Load data when switching to specific tabs
     if (tabName === 'dashboard' && !chartsInitialized) {
         loadDashboard();
-    } else if (tabName === 'analytics') {
+    } else if (tabName === 'analytics' && (!analyticsLoaded || !eventsConnected())) {
         loadAnalytics();
     }
 }
 
-// Load dashboard data
+// Load dashboard data, rendering each section as soon as the server streams it
 function loadDashboard() {
-    fetch('/api/data/summary')
-        .then(response => response.json())
-        .then(data => {
-            updateSummaryStats(data);
-            loadVisualizations();
+    streamSections('/api/data/stream', applySection)
+        .then(() => {
             chartsInitialized = true;
         })
         .catch(error => console.error('Error loading dashboard:', error));
 }
 
+// Read an NDJSON response and call onSection for every line
+function streamSections(url, onSection) {
+    return fetch(url).then(response => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        function handleLines(lines) {
+            lines.filter(line => line.trim()).forEach(line => {
+                const message = JSON.parse(line);
+                onSection(message.section, message.data);
+            });
+        }
+        
+        function pump() {
+            return reader.read().then(({ done, value }) => {
+                if (done) {
+                    handleLines([buffer]);
+                    return;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                handleLines(lines);
+                return pump();
+            });
+        }
+        
+        return pump();
+    });
+}
+
+// Render one dashboard section (from the NDJSON stream or an SSE delta)
+function applySection(name, data) {
+    const wrapped = { [name]: data };
+    switch (name) {
+        case 'summary':
+            updateSummaryStats(data);
+            createPerfCategoryChart(data);
+            break;
+        case 'grade_histogram':
+            createGradeDistChart(wrapped);
+            break;
+        case 'subject_averages':
+            createSubjectAvgChart(wrapped);
+            break;
+        // Analytics tab sections only need redrawing once that tab has been opened
+        case 'attendance_vs_grade':
+            if (analyticsLoaded) createAttendanceChart(wrapped);
+            break;
+        case 'study_hours_impact':
+            if (analyticsLoaded) createStudyHoursChart(wrapped);
+            break;
+        case 'top_performers':
+            if (analyticsLoaded) updateTopPerformers(wrapped);
+            break;
+        case 'subject_distributions':
+            if (analyticsLoaded) updateSubjectDistributions(wrapped);
+            break;
+        case 'error':
+            console.error('Error loading dashboard section:', data.error);
+            break;
+    }
+}
+
+// Subscribe to server-pushed dashboard deltas
+function connectDashboardEvents() {
+    if (!window.EventSource) return;
+    
+    dashboardEvents = new EventSource('/api/data/events');
+    dashboardEvents.addEventListener('update', event => {
+        const delta = JSON.parse(event.data);
+        Object.entries(delta.changed).forEach(([name, data]) => applySection(name, data));
+        showAtRiskAlerts(delta.new_at_risk);
+    });
+    // The data changed while the stream was reconnecting; reload everything
+    dashboardEvents.addEventListener('stale', () => {
+        loadDashboard();
+        if (analyticsLoaded) loadAnalytics();
+    });
+}
+
+// Whether dataset changes will arrive over the event stream
+function eventsConnected() {
+    return dashboardEvents !== null && dashboardEvents.readyState === EventSource.OPEN;
+}
+
+// List students who newly fell below the at-risk threshold
+function showAtRiskAlerts(students) {
+    const container = document.getElementById('atRiskAlerts');
+    if (!students || students.length === 0) {
+        container.innerHTML = '';
+        return;
+    }
+    
+    const shown = students.slice(0, 10).map(s => `${s.name} (${s.student_id})`).join(', ');
+    const more = students.length > 10 ? ` and ${students.length - 10} more` : '';
+    container.innerHTML = `<strong>${students.length} newly at-risk student(s):</strong> ${shown}${more}`;
+}
+
 // Update summary statistics
 function updateSummaryStats(data) {
     document.getElementById('totalStudents').textContent = data.total_students || 0;
@@ -55,18 +154,6 @@ function updateSummaryStats(data) {
     }
 }
 
-// Load visualizations
-function loadVisualizations() {
-    fetch('/api/data/visualizations')
-        .then(response => response.json())
-        .then(data => {
-            createGradeDistChart(data);
-            createPerfCategoryChart(data);
-            createSubjectAvgChart(data);
-        })
-        .catch(error => console.error('Error loading visualizations:', error));
-}
-
 // Create grade distribution chart
 function createGradeDistChart(data) {
     const ctx = document.getElementById('gradeDistChart');
@@ -104,49 +191,45 @@ function createGradeDistChart(data) {
 }
 
 // Create performance category chart
-function createPerfCategoryChart(data) {
+function createPerfCategoryChart(summaryData) {
     const ctx = document.getElementById('perfCategoryChart');
     if (charts.perfCategory) charts.perfCategory.destroy();
     
-    fetch('/api/data/summary')
-        .then(response => response.json())
-        .then(summaryData => {
-            if (summaryData.performance_categories) {
-                const perf = summaryData.performance_categories;
-                
-                charts.perfCategory = new Chart(ctx, {
-                    type: 'doughnut',
-                    data: {
-                        labels: ['Excellent', 'Good', 'Average', 'Below Average', 'Failing'],
-                        datasets: [{
-                            data: [
-                                perf.excellent || 0,
-                                perf.good || 0,
-                                perf.average || 0,
-                                perf.below_average || 0,
-                                perf.failing || 0
-                            ],
-                            backgroundColor: [
-                                '#4CAF50',
-                                '#8BC34A',
-                                '#FFC107',
-                                '#FF9800',
-                                '#F44336'
-                            ]
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: true,
-                        plugins: {
-                            legend: {
-                                position: 'bottom'
-                            }
-                        }
+    if (summaryData.performance_categories) {
+        const perf = summaryData.performance_categories;
+        
+        charts.perfCategory = new Chart(ctx, {
+            type: 'doughnut',
+            data: {
+                labels: ['Excellent', 'Good', 'Average', 'Below Average', 'Failing'],
+                datasets: [{
+                    data: [
+                        perf.excellent || 0,
+                        perf.good || 0,
+                        perf.average || 0,
+                        perf.below_average || 0,
+                        perf.failing || 0
+                    ],
+                    backgroundColor: [
+                        '#4CAF50',
+                        '#8BC34A',
+                        '#FFC107',
+                        '#FF9800',
+                        '#F44336'
+                    ]
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: true,
+                plugins: {
+                    legend: {
+                        position: 'bottom'
                     }
-                });
+                }
             }
         });
+    }
 }
 
 // Create subject average chart
@@ -203,6 +286,7 @@ function loadAnalytics() {
             createStudyHoursChart(data);
             updateTopPerformers(data);
             updateSubjectDistributions(data);
+            analyticsLoaded = true;
         })
         .catch(error => console.error('Error loading analytics:', error));
 }
@@ -453,7 +537,7 @@ function exportPDF() {
         });
 }
 
-// Upload file
+// Upload file in resumable chunks, then poll while the server parses it
 function uploadFile() {
     const fileInput = document.getElementById('dataFile');
     const file = fileInput.files[0];
@@ -463,32 +547,25 @@ function uploadFile() {
         return;
     }
     
-    const formData = new FormData();
-    formData.append('file', file);
-    
     const statusDiv = document.getElementById('uploadStatus');
     statusDiv.innerHTML = 'Uploading...';
     statusDiv.className = '';
     
-    fetch('/api/upload', {
+    fetch('/api/upload/init', {
         method: 'POST',
-        body: formData
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size })
     })
     .then(response => response.json())
-    .then(data => {
-        if (data.error) {
-            statusDiv.innerHTML = `Error: ${data.error}`;
-            statusDiv.className = 'error';
-        } else {
-            statusDiv.innerHTML = `Success! Loaded ${data.rows} rows with ${data.columns.length} columns.`;
-            statusDiv.className = 'success';
-            
-            // Reset charts and reload data
-            chartsInitialized = false;
-            setTimeout(() => {
-                loadDashboard();
-            }, 1000);
-        }
+    .then(session => {
+        if (session.error) throw new Error(session.error);
+        return sendChunks(file, session, 0, statusDiv, 0);
+    })
+    .then(session => fetch(`/api/upload/${session.upload_id}/finalize`, { method: 'POST' }))
+    .then(response => response.json())
+    .then(session => {
+        if (session.error) throw new Error(session.error);
+        pollUploadProgress(session.upload_id, statusDiv);
     })
     .catch(error => {
         statusDiv.innerHTML = `Error: ${error.message}`;
@@ -496,14 +573,73 @@ function uploadFile() {
     });
 }
 
+// Send the file from offset onwards, one chunk per request
+function sendChunks(file, session, offset, statusDiv, retries) {
+    if (offset >= file.size) {
+        return Promise.resolve(session);
+    }
+    
+    const end = Math.min(offset + session.chunk_size, file.size);
+    return fetch(`/api/upload/${session.upload_id}?offset=${offset}`, {
+        method: 'PUT',
+        body: file.slice(offset, end)
+    })
+    .then(response => response.json().then(data => {
+        // 409 means the server holds a different offset; resume from its count
+        if (!response.ok && !(response.status === 409 && data.received !== undefined)) {
+            throw new Error(data.error);
+        }
+        statusDiv.innerHTML = `Uploading... ${(data.received / file.size * 100).toFixed(0)}%`;
+        return sendChunks(file, session, data.received, statusDiv, 0);
+    }), error => {
+        // Network failure: ask the server how much arrived and retry from there
+        if (retries >= 5) throw error;
+        return new Promise(resolve => setTimeout(resolve, 1000 * (retries + 1)))
+            .then(() => fetch(`/api/upload/${session.upload_id}/progress`))
+            .then(response => response.json())
+            .then(status => sendChunks(file, session, status.received, statusDiv, retries + 1));
+    });
+}
+
+// Poll parse progress until the dataset is loaded
+function pollUploadProgress(uploadId, statusDiv) {
+    fetch(`/api/upload/${uploadId}/progress`)
+        .then(response => response.json())
+        .then(status => {
+            if (status.state === 'complete') {
+                statusDiv.innerHTML = `Success! Loaded ${status.rows} rows with ${status.columns.length} columns.`;
+                statusDiv.className = 'success';
+                
+                // Changed sections arrive over the event stream; reload only without it
+                if (!eventsConnected()) {
+                    chartsInitialized = false;
+                    loadDashboard();
+                }
+            } else if (status.state === 'error' || status.error) {
+                statusDiv.innerHTML = `Error: ${status.error}`;
+                statusDiv.className = 'error';
+            } else {
+                statusDiv.innerHTML = `Processing... ${status.rows_parsed} rows ` +
+                    `(${(status.parse_progress * 100).toFixed(0)}%)`;
+                setTimeout(() => pollUploadProgress(uploadId, statusDiv), 500);
+            }
+        })
+        .catch(error => {
+            statusDiv.innerHTML = `Error: ${error.message}`;
+            statusDiv.className = 'error';
+        });
+}
+
 // Load sample data
 function loadSampleData() {
     fetch('/api/data/reset', { method: 'POST' })
         .then(response => response.json())
         .then(data => {
             alert(data.message);
-            chartsInitialized = false;
-            loadDashboard();
+            if (!eventsConnected()) {
+                chartsInitialized = false;
+                loadDashboard();
+            }
         })
         .catch(error => console.error('Error loading sample data:', error));
 }
@@ -511,4 +647,5 @@ function loadSampleData() {
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
     loadDashboard();
+    connectDashboardEvents();
 });
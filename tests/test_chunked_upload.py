@@ -0,0 +1,137 @@
+import json
+import os
+import time
+import pytest
+import app as app_module
+from upload_manager import ChunkedUploadManager
+
+CSV = b''.join(
+    [b'student_id,name,math,science,english,history,attendance\n']
+    + [f'STU{i:04d},Student {i},{60 + i % 40},{55 + i % 45},{50 + i % 50},{65 + i % 30},{70 + i % 30}\n'.encode()
+       for i in range(500)]
+)
+
+
+@pytest.fixture
+def loaded():
+    return []
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch, loaded):
+    manager = ChunkedUploadManager(str(tmp_path), on_loaded=loaded.append, max_upload_size=1024 * 1024,
+                                   session_ttl=60)
+    monkeypatch.setattr(app_module, 'upload_manager', manager)
+    return manager
+
+
+@pytest.fixture
+def client(manager):
+    return app_module.app.test_client()
+
+
+def start_upload(client, size=len(CSV), filename='students.csv'):
+    response = client.post('/api/upload/init', json={'filename': filename, 'size': size})
+    assert response.status_code == 201
+    return response.get_json()['upload_id']
+
+
+def put_chunk(client, upload_id, offset, data):
+    return client.put(f'/api/upload/{upload_id}?offset={offset}', data=data)
+
+
+def wait_for_parse(client, upload_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f'/api/upload/{upload_id}/progress').get_json()
+        if status['state'] not in ('uploading', 'parsing'):
+            return status
+        time.sleep(0.05)
+    pytest.fail('Parse did not finish')
+
+
+def test_resumed_upload_is_parsed(client, loaded):
+    upload_id = start_upload(client)
+    half = len(CSV) // 2
+
+    response = put_chunk(client, upload_id, 0, CSV[:half])
+    assert response.status_code == 200
+    assert response.get_json()['received'] == half
+
+    # Resume after a dropped connection by resending an overlapping range
+    progress = client.get(f'/api/upload/{upload_id}/progress').get_json()
+    resume = progress['received'] - 100
+    response = put_chunk(client, upload_id, resume, CSV[resume:])
+    assert response.get_json()['received'] == len(CSV)
+    assert response.get_json()['upload_progress'] == 1.0
+
+    assert client.post(f'/api/upload/{upload_id}/finalize').status_code == 202
+    status = wait_for_parse(client, upload_id)
+    assert status['state'] == 'complete', status['error']
+    assert status['rows'] == 500
+    assert len(loaded) == 1 and loaded[0]['math'].iloc[3] == 63
+
+
+def test_skipping_ahead_is_rejected(client):
+    upload_id = start_upload(client)
+    put_chunk(client, upload_id, 0, CSV[:1000])
+
+    response = put_chunk(client, upload_id, 2000, CSV[2000:3000])
+    assert response.status_code == 409
+    assert response.get_json()['received'] == 1000
+
+
+def test_incomplete_upload_cannot_be_finalized(client):
+    upload_id = start_upload(client)
+    put_chunk(client, upload_id, 0, CSV[:1000])
+
+    response = client.post(f'/api/upload/{upload_id}/finalize')
+    assert response.status_code == 409
+    assert response.get_json()['received'] == 1000
+
+
+def test_chunk_past_declared_size_is_rejected(client):
+    upload_id = start_upload(client, size=100)
+    assert put_chunk(client, upload_id, 0, CSV[:200]).status_code == 400
+
+
+def test_upload_size_cap(client, manager):
+    response = client.post('/api/upload/init', json={'filename': 'big.csv', 'size': manager.max_upload_size + 1})
+    assert response.status_code == 413
+    assert response.get_json()['max_upload_size'] == manager.max_upload_size
+
+
+def test_stale_sessions_are_cleaned_up(client, manager, tmp_path):
+    stale_id = start_upload(client)
+    put_chunk(client, stale_id, 0, CSV[:1000])
+    active_id = start_upload(client)
+
+    # Age the first session past the TTL
+    meta_path = tmp_path / f'{stale_id}.json'
+    session = json.loads(meta_path.read_text())
+    session['updated_at'] -= 3600
+    meta_path.write_text(json.dumps(session))
+    old = time.time() - 3600
+    os.utime(tmp_path / f'{stale_id}.part', (old, old))
+
+    assert manager.cleanup(force=True) == 1
+    assert client.get(f'/api/upload/{stale_id}/progress').status_code == 404
+    assert not (tmp_path / f'{stale_id}.part').exists()
+    assert client.get(f'/api/upload/{active_id}/progress').status_code == 200
+
+
+def test_heartbeat_never_overwrites_final_state(client, monkeypatch, tmp_path):
+    monkeypatch.setattr('upload_manager.HEARTBEAT_SECONDS', 0.0001)
+    for _ in range(20):
+        upload_id = start_upload(client)
+        put_chunk(client, upload_id, 0, CSV)
+        client.post(f'/api/upload/{upload_id}/finalize')
+        assert wait_for_parse(client, upload_id)['state'] == 'complete'
+
+        # Other worker processes read the state from disk; it must settle on complete
+        meta_path = tmp_path / f'{upload_id}.json'
+        deadline = time.monotonic() + 2
+        while json.loads(meta_path.read_text())['state'] == 'parsing' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert json.loads(meta_path.read_text())['state'] == 'complete'
+    assert not list(tmp_path.glob('*.tmp'))
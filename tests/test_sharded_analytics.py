@@ -0,0 +1,84 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import StudentAnalytics
+from sharded_analytics import run_sharded_analytics
+
+RELATIVE_ACCURACY = 0.001
+
+
+@pytest.fixture(scope='module')
+def students():
+    """Student records with missing values, several schools and a constant column"""
+    rng = np.random.default_rng(7)
+    n = 1000
+    df = pd.DataFrame({
+        'student_id': [f'STU{i:05d}' for i in range(n)],
+        'name': [f'Student {i}' for i in range(n)],
+        'school': rng.choice(['North', 'South', 'East', 'West', 'Central'], n),
+        'math': rng.integers(30, 100, n).astype(float),
+        'science': rng.normal(70, 15, n).clip(0, 100),
+        'english': rng.integers(40, 100, n).astype(float),
+        'history': rng.normal(65, 12, n).clip(0, 100),
+        'attendance': rng.integers(50, 100, n).astype(float),
+        'assignments_submitted': rng.integers(0, 20, n).astype(float),
+        'total_assignments': 20,
+        'study_hours': rng.gamma(4, 4, n)
+    })
+    for col, fraction in [('math', 0.05), ('science', 0.1), ('attendance', 0.08), ('study_hours', 0.2)]:
+        df.loc[rng.random(n) < fraction, col] = np.nan
+    df['average_grade'] = df[['math', 'science', 'english', 'history']].mean(axis=1).round(2)
+    return df
+
+
+@pytest.fixture(scope='module')
+def expected(students):
+    analytics = StudentAnalytics()
+    return {
+        'summary': analytics.get_summary_stats(students),
+        'visualizations': analytics.get_visualization_data(students),
+        'correlation_matrix': analytics.get_correlation_matrix(students.drop(columns='school'))
+    }
+
+
+def assert_close(actual, expected, **tolerance):
+    if math.isnan(expected):
+        assert math.isnan(actual)
+    else:
+        assert actual == pytest.approx(expected, **tolerance)
+
+
+@pytest.mark.parametrize('options', [
+    {'shard_by': 'rows', 'shard_rows': 137},
+    {'shard_by': 'school', 'shard_rows': 250}
+], ids=['rows', 'school'])
+def test_sharded_run_matches_single_frame(students, expected, options):
+    result = run_sharded_analytics(students, workers=2, relative_accuracy=RELATIVE_ACCURACY, **options)
+    assert result['shards'] > 1
+
+    summary, viz = result['summary'], result['visualizations']
+    assert summary['total_students'] == expected['summary']['total_students']
+    assert summary['grade_distribution'] == expected['summary']['grade_distribution']
+    assert summary['performance_categories'] == expected['summary']['performance_categories']
+
+    # Counts and moments merge exactly; quantiles come from the sketch
+    for col, stats in expected['summary']['statistics'].items():
+        actual = summary['statistics'][col]
+        for key in ('mean', 'std', 'min', 'max'):
+            assert_close(actual[key], stats[key], rel=1e-12)
+        for key in ('median', 'q1', 'q3'):
+            assert_close(actual[key], stats[key], rel=RELATIVE_ACCURACY)
+
+    for col, mean in expected['visualizations']['subject_averages'].items():
+        assert_close(viz['subject_averages'][col], mean, rel=1e-12)
+    assert viz['grade_histogram']['counts'] == list(expected['visualizations']['grade_histogram']['counts'])
+    assert viz['subject_distributions'] == expected['visualizations']['subject_distributions']
+    for section in ('attendance_vs_grade', 'study_hours_impact'):
+        assert_close(viz[section]['correlation'], expected['visualizations'][section]['correlation'], abs=1e-12)
+
+    matrix = result['correlation_matrix']
+    assert matrix.keys() == expected['correlation_matrix'].keys()
+    for col_j, column in expected['correlation_matrix'].items():
+        for col_i, value in column.items():
+            assert_close(matrix[col_j][col_i], value, abs=1e-12)
@@ -0,0 +1,292 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+import pandas as pd
+from werkzeug.utils import secure_filename
+
+CHUNK_SIZE = 4 * 1024 * 1024  # Suggested chunk size, well under MAX_CONTENT_LENGTH
+COPY_BLOCK_SIZE = 1024 * 1024
+PARSE_CHUNK_ROWS = 50000
+ALLOWED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+# A parsing session writes a heartbeat this often; one silent for
+# PARSE_STALE_SECONDS is treated as a crashed parse and can be finalized again
+HEARTBEAT_SECONDS = 2
+PARSE_STALE_SECONDS = 30
+SESSION_TTL_SECONDS = 24 * 60 * 60
+CLEANUP_INTERVAL_SECONDS = 10 * 60
+
+
+class UploadError(Exception):
+    """Upload protocol error carrying the HTTP status to report"""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class ChunkedUploadManager:
+    """Resumable chunked file uploads with background parsing
+
+    Protocol: init_upload() creates a session, write_chunk() stores bytes at
+    a given offset (resending an already received range is allowed, skipping
+    ahead is not), finalize() starts parsing in a background thread and
+    status() reports upload and parse progress.
+
+    Session metadata is kept next to the partial file, so any worker process
+    can serve any request and an upload can resume after a restart. The
+    process parsing a file records itself as owner and refreshes a heartbeat;
+    other processes read its progress from disk. Unfinished sessions idle for
+    longer than session_ttl seconds are deleted.
+    """
+
+    def __init__(self, upload_dir, on_loaded, max_upload_size=None, session_ttl=SESSION_TTL_SECONDS):
+        self.upload_dir = upload_dir
+        self.on_loaded = on_loaded
+        self.max_upload_size = max_upload_size
+        self.session_ttl = session_ttl
+        self._sessions = {}  # Sessions this process is parsing
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def _paths(self, upload_id):
+        base = os.path.join(self.upload_dir, upload_id)
+        return base + '.part', base + '.json'
+
+    def _save(self, session):
+        _, meta_path = self._paths(session['upload_id'])
+        session['updated_at'] = time.time()
+        # Write then rename so other processes never read a half-written file;
+        # each write gets its own temp file so concurrent saves cannot collide
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, prefix=session['upload_id'], suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(session, fh)
+            os.replace(tmp_path, meta_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _session_lock(self, upload_id):
+        with self._lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _get(self, upload_id):
+        if not upload_id.isalnum():
+            raise UploadError('Unknown upload', 404)
+        with self._lock:
+            session = self._sessions.get(upload_id)
+            if session is not None:
+                return session
+
+        part_path, meta_path = self._paths(upload_id)
+        try:
+            with open(meta_path) as fh:
+                session = json.load(fh)
+        except FileNotFoundError:
+            raise UploadError('Unknown upload', 404)
+
+        if session['state'] == 'parsing' and time.time() - session.get('heartbeat', 0) > PARSE_STALE_SECONDS:
+            # The parsing process died; the file is complete, parse again on finalize
+            session['state'] = 'uploading'
+        if session['state'] == 'uploading':
+            session['received'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        return session
+
+    def status(self, upload_id):
+        """Public view of a session's upload and parse progress"""
+        view = dict(self._get(upload_id))
+        view['upload_progress'] = view['received'] / view['size'] if view['size'] else 1.0
+        return view
+
+    def init_upload(self, filename, size):
+        """Start a new upload session for a file of the given size in bytes"""
+        filename = secure_filename(filename or '')
+        if not filename:
+            raise UploadError('No file selected')
+        if not filename.endswith(ALLOWED_EXTENSIONS):
+            raise UploadError('Unsupported file format. Use CSV or Excel')
+        if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+            raise UploadError('File size must be a non-negative integer')
+        if self.max_upload_size is not None and size > self.max_upload_size:
+            raise UploadError('File too large', 413, max_upload_size=self.max_upload_size)
+
+        self.cleanup()
+        upload_id = uuid.uuid4().hex
+        session = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'size': size,
+            'received': 0,
+            'chunk_size': CHUNK_SIZE,
+            'state': 'uploading',
+            'rows_parsed': 0,
+            'parse_progress': 0.0,
+            'rows': None,
+            'columns': None,
+            'error': None
+        }
+        part_path, _ = self._paths(upload_id)
+        open(part_path, 'wb').close()
+        self._save(session)
+        return self.status(upload_id)
+
+    def write_chunk(self, upload_id, offset, stream):
+        """Write bytes from stream at offset and return the updated status"""
+        with self._session_lock(upload_id):
+            session = self._get(upload_id)
+            if session['state'] != 'uploading':
+                raise UploadError('Upload already finalized', 409)
+            if offset < 0 or offset > session['received']:
+                raise UploadError('Chunk offset does not match received bytes', 409,
+                                  received=session['received'])
+
+            part_path, _ = self._paths(upload_id)
+            remaining = session['size'] - offset
+            with open(part_path, 'r+b') as fh:
+                fh.seek(offset)
+                while True:
+                    block = stream.read(COPY_BLOCK_SIZE)
+                    if not block:
+                        break
+                    if len(block) > remaining:
+                        raise UploadError('Chunk extends past declared file size', 400,
+                                          received=session['received'])
+                    fh.write(block)
+                    remaining -= len(block)
+        return self.status(upload_id)
+
+    def finalize(self, upload_id):
+        """Check the upload is complete and start parsing it in the background"""
+        with self._session_lock(upload_id):
+            session = self._get(upload_id)
+            if session['state'] in ('parsing', 'complete'):
+                return self.status(upload_id)
+            if session['received'] != session['size']:
+                raise UploadError('Upload incomplete', 409, received=session['received'])
+            if not self._claim(upload_id):
+                # Another worker process is starting the parse
+                return self.status(upload_id)
+
+            session.update({
+                'state': 'parsing',
+                'error': None,
+                'rows_parsed': 0,
+                'parse_progress': 0.0,
+                'owner_pid': os.getpid(),
+                'heartbeat': time.time()
+            })
+            self._save(session)
+            with self._lock:
+                self._sessions[upload_id] = session
+
+        thread = threading.Thread(target=self._parse, args=(session,), daemon=True)
+        thread.start()
+        return self.status(upload_id)
+
+    def _claim(self, upload_id):
+        """Atomically claim the right to parse an upload across processes"""
+        claim_path = os.path.join(self.upload_dir, upload_id + '.claim')
+        for _ in range(2):
+            try:
+                os.close(os.open(claim_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(claim_path) <= PARSE_STALE_SECONDS:
+                        return False
+                    os.remove(claim_path)  # Left behind by a crashed parse
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def _heartbeat(self, session, done):
+        """Persist progress and liveness until the parse finishes"""
+        while not done.wait(HEARTBEAT_SECONDS):
+            session['heartbeat'] = time.time()
+            self._save(dict(session))
+
+    def _parse(self, session):
+        """Background task: stream the file into a DataFrame and hand it to on_loaded"""
+        upload_id = session['upload_id']
+        part_path, _ = self._paths(upload_id)
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(session, done), daemon=True)
+        heartbeat.start()
+        try:
+            if session['filename'].endswith('.csv'):
+                chunks = []
+                with open(part_path, 'rb') as fh:
+                    for chunk in pd.read_csv(fh, chunksize=PARSE_CHUNK_ROWS):
+                        chunks.append(chunk)
+                        session['rows_parsed'] += len(chunk)
+                        if session['size']:
+                            session['parse_progress'] = min(fh.tell() / session['size'], 1.0)
+                df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+            else:
+                df = pd.read_excel(part_path)
+                session['rows_parsed'] = len(df)
+
+            self.on_loaded(df)
+            session['rows'] = len(df)
+            session['columns'] = [str(col) for col in df.columns]
+            session['parse_progress'] = 1.0
+            session['state'] = 'complete'
+            os.replace(part_path, os.path.join(self.upload_dir, f"{upload_id}_{session['filename']}"))
+        except Exception as e:
+            session['state'] = 'error'
+            session['error'] = str(e)
+        finally:
+            done.set()
+            # A heartbeat write in progress must land before the final state
+            heartbeat.join()
+        self._save(session)
+        with self._lock:
+            self._sessions.pop(upload_id, None)
+        try:
+            os.remove(os.path.join(self.upload_dir, upload_id + '.claim'))
+        except FileNotFoundError:
+            pass
+
+    def cleanup(self, force=False):
+        """Delete unfinished sessions idle for longer than session_ttl
+
+        Runs at most once per CLEANUP_INTERVAL_SECONDS unless force is set.
+        Completed uploads are kept.
+        """
+        now = time.time()
+        if not force and now - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return 0
+        self._last_cleanup = now
+
+        removed = 0
+        for entry in os.listdir(self.upload_dir):
+            upload_id, ext = os.path.splitext(entry)
+            if ext != '.json' or not upload_id.isalnum():
+                continue
+            try:
+                session = self._get(upload_id)
+            except (UploadError, ValueError):
+                continue
+            if session['state'] not in ('uploading', 'error'):
+                continue
+            part_path, meta_path = self._paths(upload_id)
+            last_active = max(session.get('updated_at', 0),
+                              os.path.getmtime(part_path) if os.path.exists(part_path) else 0)
+            if now - last_active <= self.session_ttl:
+                continue
+            for path in (part_path, meta_path, os.path.join(self.upload_dir, upload_id + '.claim')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._locks.pop(upload_id, None)
+            removed += 1
+        return removed